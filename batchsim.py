@@ -0,0 +1,356 @@
+import argparse
+import time
+
+import numpy as np
+
+from trainhop import (SCREEN_WIDTH, SCREEN_HEIGHT, GRAVITY_STEP, INPUT_LEFT, INPUT_RIGHT, BOOSTS, CHUNK_PLATFORMS, PREFETCH_CHUNKS,
+                      PLAYER_WIDTH, PLAYER_HEIGHT, PLATFORM_WIDTH, PLATFORM_HEIGHT, SPRING_SIZE, SPIKE_SIZE)
+
+
+# THE RULES OF trainhop.Simulation FOR ONE OR TWO HUMANS (NO BOTS OR GHOSTS), BUT N GAMES AT ONCE AS NUMPY ARRAYS:
+# SWEPT COLLISION AS IN trainhop.swept_hit, DIFFICULTY TIERS PICKED PER PREFETCHED CHUNK AS IN LevelGenerator, BOOSTS FROM trainhop.BOOSTS.
+# THE RANDOM STREAM IS NUMPY'S, SO RUNS MATCH THE RULES BUT NOT THE EXACT LEVELS OF Simulation.
+# THE ONLY RULE DIFFERENCES ARE NOTED IN updatePlatforms, AND PLAYERS ARE CHECKED ONE AFTER THE OTHER INSTEAD OF PLATFORM BY PLATFORM.
+
+START_PLATFORMS = 35 # 2 STARTING PLATFORMS + THE generatePlatforms OPENING SECTION
+ENTITY_SLOTS = 32 # SPIKES/SPRINGS KEPT PER GAME, OLDEST ARE OVERWRITTEN (THEY ARE FAR BELOW THE CAMERA BY THEN)
+SPIKE_TIP = int(SPIKE_SIZE * 0.25) # trainhop.Spike's RECT, WHICH pygame TRUNCATES LIKE int()
+OPENING_WEIGHTS = np.array([75, 50, 25]) / 150
+SPAWN_WEIGHTS = np.array([65, 50, 35]) / 150
+
+
+def swept(x0, y0, x1, y1, left, top, width, height): # trainhop.swept_hit ON ARRAYS - RECT COORDS ARE TRUNCATED TO INTS, SIZES MUST ALREADY BE
+    left, top = np.trunc(left), np.trunc(top)
+    # CHEAP FIRST CUT, AS IN Player.swept_hits - THE BOX AROUND THE WHOLE SWEEP
+    hit = ((left < np.maximum(x0, x1) + PLAYER_WIDTH) & (np.minimum(x0, x1) < left + width) &
+           (top < np.maximum(y0, y1) + PLAYER_HEIGHT) & (np.minimum(y0, y1) < top + height))
+    pairs = np.nonzero(hit)
+    if not len(pairs[0]):
+        return hit
+    x0, y0, x1, y1, left, top = (np.broadcast_to(a, hit.shape)[pairs] for a in (x0, y0, x1, y1, left, top))
+    enter, leave, inside = 0.0, 1.0, True
+    for start, end, low, high in ((x0, x1, left - PLAYER_WIDTH, left + width), (y0, y1, top - PLAYER_HEIGHT, top + height)):
+        still = start == end
+        span = np.where(still, 1, end - start)
+        a = (low - start) / span
+        b = (high - start) / span
+        inside = inside & np.where(still, (low < start) & (start < high), True)
+        enter = np.where(still, enter, np.maximum(enter, np.minimum(a, b)))
+        leave = np.where(still, leave, np.minimum(leave, np.maximum(a, b)))
+    hit[pairs] = inside & (enter < leave)
+    return hit
+
+
+class BatchSimulation:
+    def __init__(self, games, mode="singleplayer", autoscroll=False, highscore=0, seed=None):
+        self.n = games
+        self.mode = mode
+        self.autoscroll = autoscroll
+        self.player_count = 1 if mode == "singleplayer" else 2
+        self.rng = np.random.default_rng(seed)
+        self.rows = np.arange(games)
+
+        n, p, r, s = games, self.player_count, START_PLATFORMS, ENTITY_SLOTS
+        # PLAYERS
+        self.x = np.zeros((n, p))
+        self.y = np.zeros((n, p))
+        self.prev_x = np.zeros((n, p)) # WHERE THE LAST TICK STARTED, FOR SWEPT COLLISION
+        self.prev_y = np.zeros((n, p))
+        self.jump = np.zeros((n, p))
+        self.gravity = np.zeros((n, p))
+        self.xmovement = np.zeros((n, p))
+        self.direction = np.zeros((n, p), dtype=np.int8)
+        # PLATFORM RINGS - head IS THE OLDEST PLATFORM (platforms[0] IN Simulation)
+        self.plat_x = np.zeros((n, r))
+        self.plat_y = np.zeros((n, r))
+        self.plat_type = np.zeros((n, r), dtype=np.int8)
+        self.plat_state = np.zeros((n, r), dtype=np.int8)
+        self.plat_speed = np.zeros((n, r))
+        self.head = np.zeros(n, dtype=np.int64)
+        # PREFETCHED CHUNKS - ONLY THE SCORE EACH WAS MADE AT IS KEPT, IT PICKS THE TIER OF ITS PLATFORMS
+        self.chunk_score = np.zeros((n, PREFETCH_CHUNKS), dtype=np.int64)
+        self.chunk_tail = np.zeros(n, dtype=np.int64) # NEXT SLOT TO WRITE
+        self.queued = np.zeros(n, dtype=np.int64) # PLATFORMS PREFETCHED BUT NOT SPAWNED
+        # SPRING AND SPIKE RINGS
+        self.spring_x = np.zeros((n, s))
+        self.spring_y = np.zeros((n, s))
+        self.spring_state = np.zeros((n, s), dtype=np.int8)
+        self.spring_live = np.zeros((n, s), dtype=bool)
+        self.spring_head = np.zeros(n, dtype=np.int64)
+        self.spike_x = np.zeros((n, s))
+        self.spike_y = np.zeros((n, s))
+        self.spike_live = np.zeros((n, s), dtype=bool)
+        self.spike_head = np.zeros(n, dtype=np.int64)
+        # PER GAME
+        self.score = np.zeros(n, dtype=np.int64)
+        self.cameray = np.zeros(n)
+        self.highscore = np.full(n, highscore, dtype=np.int64)
+        self.ticks = np.zeros(n, dtype=np.int64)
+        self.done = np.zeros(n, dtype=bool)
+
+        self.reset()
+
+    def reset(self, mask=None): # RESET THE SELECTED GAMES (ALL BY DEFAULT)
+        g = self.rows if mask is None else np.nonzero(mask)[0]
+        k = len(g)
+        if not k:
+            return
+
+        self.x[g] = self.prev_x[g] = SCREEN_WIDTH//2-50 + 100 * np.arange(self.player_count)
+        self.y[g] = self.prev_y[g] = SCREEN_HEIGHT-400
+        for a in (self.jump, self.gravity, self.xmovement, self.direction):
+            a[g] = 0
+
+        # STARTING PLATFORMS, THEN THE OPENING SECTION FROM Simulation.generatePlatforms
+        self.plat_x[g, 0] = SCREEN_WIDTH//2-50
+        self.plat_x[g, 1] = SCREEN_WIDTH//2-50 if self.mode != "multiplayer" else SCREEN_WIDTH//2+50
+        self.plat_y[g, :2] = SCREEN_HEIGHT-300
+        opening = START_PLATFORMS - 2
+        self.plat_x[g, 2:] = self.rng.integers(0, SCREEN_WIDTH-100, (k, opening), endpoint=True)
+        self.plat_y[g, 2:] = SCREEN_HEIGHT+100 - 50 * np.arange(opening)
+        kind = self.rng.choice(3, size=(k, START_PLATFORMS), p=OPENING_WEIGHTS)
+        kind[:, :2] = 0
+        self.plat_type[g] = kind
+        self.plat_state[g] = 0
+        self.plat_speed[g] = np.where(kind == 1, self.rng.uniform(4, 7.5, (k, START_PLATFORMS)), 0)
+        self.head[g] = 0
+        self.chunk_tail[g] = 0
+        self.queued[g] = 0
+
+        self.spring_live[g] = False
+        self.spring_head[g] = 0
+        self.spike_live[g] = False
+        self.spike_head[g] = 0
+
+        self.score[g] = 0
+        self.cameray[g] = 0
+        self.ticks[g] = 0
+        self.done[g] = False
+
+    def step(self, inputs=0): # INPUTS IS A SCALAR OR AN (N, PLAYERS) ARRAY OF INPUT BITFIELDS, RETURNS THE DONE MASK
+        alive = ~self.done
+        if not alive.any():
+            return self.done
+        self.ticks += alive
+
+        if self.autoscroll: # AUTOSCROLLING
+            self.cameray -= np.where(alive, self.score // 10000 * 0.25 + 0.75, 0)
+
+        self.checkHighscore(alive)
+        self.prefetch(alive & (self.queued <= (PREFETCH_CHUNKS - 1) * CHUNK_PLATFORMS))
+        self.spawnPlatforms(alive)
+        self.updatePlayers(np.broadcast_to(inputs, self.x.shape), alive)
+        self.updatePlatforms(alive)
+        self.checkPlayers(alive)
+        return self.done
+
+    def boost(self, g, jump): # GROUP BOOST - EVERY PLAYER IN THE GAMES g
+        self.gravity[g] = 0
+        self.jump[g] = jump
+
+    def checkHighscore(self, alive): # HIGH SCORE LINE BOOST (PLAYER 1 ONLY, LIKE Simulation)
+        hs = self.highscore
+        g = alive & (-1.1 * hs <= self.y[:, 0]) & (self.y[:, 0] <= -0.9 * hs)
+        jump, lift = BOOSTS["newhighscore"][self.mode == "multiplayer"]
+        self.boost(g, jump)
+        self.cameray -= np.where(g, lift, 0)
+
+    def prefetch(self, need): # Simulation.prefetch - QUEUE ONE CHUNK, ITS TIER FIXED BY THE SCORE RIGHT NOW
+        self.chunk_score[need, self.chunk_tail[need]] = self.score[need]
+        self.chunk_tail[need] = (self.chunk_tail[need] + 1) % PREFETCH_CHUNKS
+        self.queued[need] += CHUNK_PLATFORMS
+
+    def spawnPlatforms(self, alive): # ONE NEW PLATFORM PER GAME PER PASS, WHILE platforms[1] IS BELOW THE SCREEN
+        r = START_PLATFORMS
+        for _ in range(r):
+            second = (self.head + 1) % r
+            need = alive & (self.plat_y[self.rows, second] - self.cameray > SCREEN_HEIGHT)
+            if not need.any():
+                break
+            self.prefetch(need & (self.queued == 0)) # CAMERA OUTRAN THE QUEUE
+            g = np.nonzero(need)[0]
+            k = len(g)
+            slot = self.head[g] # THE NEW PLATFORM TAKES THE OLDEST SLOT - append() AND pop(0) IN ONE
+            last = (slot - 1) % r
+            chunks = (self.queued[g] + CHUNK_PLATFORMS - 1) // CHUNK_PLATFORMS # THE OLDEST QUEUED CHUNK IS THIS MANY BACK FROM THE TAIL
+            score = self.chunk_score[g, (self.chunk_tail[g] - chunks) % PREFETCH_CHUNKS]
+            self.queued[g] -= 1
+
+            kind = self.rng.choice(3, size=k, p=SPAWN_WEIGHTS)
+            low, mid = score < 30000, score < 100000
+            spike_chance = np.where(low, 1 / 10, np.where(mid, 1 / 5, 1 / 3))
+            dist = np.where(low, score // 250 + 50, np.where(mid, score // 750 + 30, score // 1000 + 30))
+            x = self.rng.integers(0, SCREEN_WIDTH-100, k, endpoint=True).astype(float)
+            y = self.plat_y[g, last] - dist
+
+            self.plat_x[g, slot] = x
+            self.plat_y[g, slot] = y
+            self.plat_type[g, slot] = kind
+            self.plat_state[g, slot] = 0
+            self.plat_speed[g, slot] = np.where(kind == 1, self.rng.uniform(3, 7, k), 0)
+            self.head[g] = (slot + 1) % r
+
+            spring = (self.rng.integers(0, 1000, k, endpoint=True) > 900) & (kind == 0)
+            spike = (self.rng.random(k) < spike_chance) & (kind != 1)
+            self.addEntity(g[spring], x[spring], y[spring] - 25, self.spring_x, self.spring_y, self.spring_live, self.spring_head, self.spring_state)
+            self.addEntity(g[spike], x[spike], y[spike] - 50, self.spike_x, self.spike_y, self.spike_live, self.spike_head)
+
+    def addEntity(self, g, x, y, ex, ey, live, head, state=None):
+        if not len(g):
+            return
+        slot = head[g]
+        ex[g, slot] = x + self.rng.integers(0, 50, len(g), endpoint=True)
+        ey[g, slot] = y
+        live[g, slot] = True
+        if state is not None:
+            state[g, slot] = 0
+        head[g] = (slot + 1) % ENTITY_SLOTS
+
+    def updatePlayers(self, inputs, alive): # Player.update AND CAMERA MOVEMENT
+        a = alive[:, None]
+        self.prev_x = np.where(a, self.x, self.prev_x)
+        self.prev_y = np.where(a, self.y, self.prev_y)
+        falling = a & (self.jump == 0)
+        rising = a & (self.jump != 0)
+        self.y += np.where(falling, self.gravity, 0) - np.where(rising, self.jump, 0)
+        self.gravity += np.where(falling, GRAVITY_STEP, 0)
+        self.jump -= np.where(rising, GRAVITY_STEP, 0)
+
+        left = a & (inputs & INPUT_LEFT != 0)
+        right = a & (inputs & INPUT_RIGHT != 0)
+        self.xmovement = np.where(left, np.maximum(self.xmovement - 1, -10), self.xmovement)
+        self.direction[left] = 1
+        self.xmovement = np.where(right, np.minimum(self.xmovement + 1, 10), self.xmovement)
+        self.direction[right] = 0
+        self.xmovement = np.where(a, self.xmovement * 0.9, self.xmovement) # INTERTIA!
+        self.x += np.where(a, self.xmovement, 0)
+        self.x = np.where(self.x > SCREEN_WIDTH, -50, np.where(self.x < -50, SCREEN_WIDTH, self.x))
+
+        for p in range(self.player_count): # CAMERA MOVEMENT, PLAYER BY PLAYER LIKE Simulation
+            self.cameray -= np.where(alive & (self.y[:, p] - self.cameray <= -100), 45, 0)
+            d = self.y[:, p] - self.cameray
+            self.cameray -= np.where(alive & (d <= 100), 35, np.where(alive & (d <= 300), 15, 0))
+
+    def updatePlatforms(self, alive): # PLAYER AND PLATFORM COLLISION, BLUE PLATFORM MOVEMENT
+        # EACH PLAYER LANDS ON THE FIRST PLATFORM (IN LIST ORDER) IT TOUCHES - ONCE LANDED, gravity IS 0 AND NO LATER PLATFORM CAN CATCH IT.
+        # THE ONE EXCEPTION IN Simulation IS A RED STAGE 2 RESETTING TO STAGE 0, WHICH LEAVES THE PLAYER FALLING; HERE IT STILL ENDS THE SEARCH.
+        order = (self.head[:, None] + np.arange(START_PLATFORMS)) % START_PLATFORMS
+        px = np.take_along_axis(self.plat_x, order, 1)
+        py = np.take_along_axis(self.plat_y, order, 1)
+        kind = np.take_along_axis(self.plat_type, order, 1)
+        solid = ~((kind == 2) & (np.take_along_axis(self.plat_state, order, 1) == 3))
+
+        for p in range(self.player_count):
+            x0, y0, x1, y1 = self.sweep(p)
+            y = self.y[:, p:p+1]
+            hit = swept(x0, y0, x1, y1, px, py, PLATFORM_WIDTH - 10, PLATFORM_HEIGHT)
+            hit &= solid & (y < py - self.cameray[:, None]) & ((self.gravity[:, p] != 0) & alive)[:, None]
+            landed = hit.any(1)
+            if not landed.any():
+                continue
+            g = np.nonzero(landed)[0]
+            slot = order[g, hit[g].argmax(1)]
+            kind_hit = self.plat_type[g, slot]
+            state = self.plat_state[g, slot]
+            roll = self.rng.random((3, len(g)))
+
+            bounce = (kind_hit != 2) | (state <= 1) | (roll[0] < 0.3) # NORMAL JUMP
+            self.jump[g[bounce], p] = 15
+            self.gravity[g[bounce], p] = 0
+
+            red = kind_hit == 2
+            cracked = red & (state <= 1) # STAGE 0 OR 1, RANDOMLY INCREASE STATE/DISAPPEAR
+            state = np.where(cracked & (roll[1] > 0.1), state + 1, state)
+            state = np.where(cracked & (state == 1) & (roll[2] < 0.3), 3, state)
+
+            stage2 = red & (self.plat_state[g, slot] == 2) # STAGE 2, JUMP, RESET OR BIG BOOST
+            success = stage2 & (roll[0] >= 0.3) & (roll[1] >= 0.1)
+            state = np.where(stage2 & (roll[0] < 0.3), 3, state)
+            state = np.where(stage2 & (roll[0] >= 0.3) & (roll[1] < 0.1), 0, state)
+            state = np.where(success, 3, state)
+            self.plat_state[g, slot] = state
+
+            if success.any():
+                gs = g[success]
+                if self.mode == "singleplayer":
+                    jump, lift = BOOSTS["success"][0]
+                    self.gravity[gs, p] = 0
+                    self.jump[gs, p] = jump
+                else:
+                    jump, lift = BOOSTS["success"][1]
+                    self.boost(gs, jump)
+                self.cameray[gs] -= lift
+
+        # BLUE PLATFORM MOVEMENT, BASED ON SPEED
+        blue = (self.plat_type == 1) & alive[:, None]
+        right = blue & (self.plat_state == 1)
+        left = blue & (self.plat_state != 1)
+        self.plat_x += np.where(right, self.plat_speed, 0) - np.where(left, self.plat_speed, 0)
+        self.plat_state[right & (self.plat_x > SCREEN_WIDTH - 100)] = 0
+        self.plat_state[left & (self.plat_x <= 0)] = 1
+
+    def checkPlayers(self, alive): # UPDATE SCORE - SPIKE AND SPRING - CHECK FOR GAME OVER
+        for p in range(self.player_count):
+            x0, y0, x1, y1 = self.sweep(p)
+            height = -self.y[:, p]
+            self.score = np.where(alive & (height > self.score), -np.trunc(self.y[:, p]).astype(np.int64), self.score)
+
+            fell = alive & (self.y[:, p] - self.cameray > SCREEN_HEIGHT)
+            spiked = alive & (self.jump[:, p] <= 0) & (self.spike_live & swept(x0, y0, x1, y1, self.spike_x + SPIKE_SIZE / 4, self.spike_y, SPIKE_TIP, SPIKE_TIP)).any(1)
+            self.done |= fell | spiked
+            alive = alive & ~(fell | spiked)
+
+            touched = self.spring_live & swept(x0, y0, x1, y1, self.spring_x, self.spring_y, SPRING_SIZE, SPRING_SIZE) & alive[:, None]
+            hits = touched.sum(1)
+            if not hits.any():
+                continue
+            self.spring_state[touched] = 1
+            g = np.nonzero(hits)[0]
+            if self.mode == "multiplayer": # SPRING BOOST BASED ON MODE
+                jump, lift = BOOSTS["boing"][1]
+                self.boost(g, jump)
+            else: # A SECOND SPRING IN THE SAME TICK SEES jump >= 20 FROM THE FIRST
+                jump, lift = BOOSTS["boing"][0]
+                self.jump[g, p] = np.where((self.jump[g, p] >= 20) | (hits[g] > 1), 50, jump)
+                self.gravity[g, p] = 0
+            self.cameray[g] -= lift * hits[g]
+
+    def sweep(self, p): # PLAYER p's LAST TICK AS INT START AND END COLUMNS, THE WAY Player.swept_hits TRUNCATES THEM
+        x1, y1 = np.trunc(self.x[:, p:p+1]), np.trunc(self.y[:, p:p+1])
+        x0 = np.where(np.abs(self.x[:, p:p+1] - self.prev_x[:, p:p+1]) < SCREEN_WIDTH // 2, np.trunc(self.prev_x[:, p:p+1]), x1) # A WRAP IS A JUMP
+        return x0, np.trunc(self.prev_y[:, p:p+1]), x1, y1
+
+    def run(self, ticks, policy=None): # STEP UNTIL EVERY GAME IS DONE OR ticks RUN OUT. policy(sim) RETURNS INPUTS
+        for _ in range(ticks):
+            if self.step(0 if policy is None else policy(self)).all():
+                break
+        return self.score
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run many Train Hop games at once and report score statistics.")
+    parser.add_argument("--games", type=int, default=4096)
+    parser.add_argument("--ticks", type=int, default=3600)
+    parser.add_argument("--mode", choices=["singleplayer", "multiplayer"], default="singleplayer")
+    parser.add_argument("--autoscroll", action="store_true")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    sim = BatchSimulation(args.games, args.mode, args.autoscroll, seed=args.seed)
+    start = time.perf_counter()
+    # RANDOM WALK INPUT - EVERY PLAYER HOLDS LEFT, RIGHT OR NOTHING, CHANGING NOW AND THEN
+    held = sim.rng.integers(0, 3, sim.x.shape)
+    def policy(sim):
+        change = sim.rng.random(held.shape) < 0.05
+        held[change] = sim.rng.integers(0, 3, change.sum())
+        return held
+    scores = sim.run(args.ticks, policy)
+    elapsed = time.perf_counter() - start
+
+    frames = int(sim.ticks.sum())
+    print(f"{args.games} games, {frames} frames in {elapsed:.2f}s ({frames / elapsed:,.0f} frames/s)")
+    print(f"finished: {int(sim.done.sum())}  score mean: {scores.mean():.0f}  p50: {np.percentile(scores, 50):.0f}  p99: {np.percentile(scores, 99):.0f}  max: {scores.max()}")
+
+
+if __name__ == "__main__":
+    main()
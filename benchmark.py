@@ -0,0 +1,179 @@
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy") # NO WINDOW, NO SOUND CARD - SET BEFORE PYGAME IS IMPORTED
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import json
+import random
+import subprocess
+import sys
+import time
+
+try:
+    import resource
+except ImportError: # WINDOWS
+    resource = None
+
+import trainhop
+from trainhop import FPS, SCREEN_HEIGHT, INPUT_LEFT, INPUT_RIGHT, AUTOPILOT_BUDGET
+
+
+# NAME: (MODE, AUTOSCROLL, STARTING SCORE, TICKS[, BOTS]). THE STARTING SCORE PICKS THE GENERATION TIER IN LevelGenerator
+SCENARIOS = {
+    "tier1-single": ("singleplayer", False, 0, 3600),
+    "tier2-single": ("singleplayer", False, 30000, 3600),
+    "tier3-single": ("singleplayer", False, 100000, 3600),
+    "tier1-multi": ("multiplayer", False, 0, 3600),
+    "tier2-multi": ("multiplayer", False, 30000, 3600),
+    "tier3-multi": ("multiplayer", False, 100000, 3600),
+    "autoscroll-single": ("singleplayer", True, 0, 3600),
+    "autoscroll-multi": ("multiplayer", True, 0, 3600),
+    "long-autoscroll": ("singleplayer", True, 0, 30 * 60 * FPS), # 30 MINUTES OF GAME TIME
+    "crowd-64": ("multiplayer", False, 0, 3600, 62), # 2 HUMANS AND 62 BOTS
+}
+BASELINE = "benchmark_baseline.json"
+
+
+def peak_rss_mb():
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024 # BYTES ON MACOS, KB ON LINUX
+
+
+def keep_alive(sim): # SCRIPTED RUNS LAST THEIR FULL LENGTH - A PLAYER THAT WOULD DIE IS BOUNCED BACK INTO VIEW INSTEAD
+    if not sim.game_over:
+        return False
+    sim.game_over = False
+    for player in sim.players:
+        if player.y - sim.cameray > SCREEN_HEIGHT - 300 or player.jump <= 0:
+            player.y = sim.cameray + SCREEN_HEIGHT // 2
+            player.gravity = 0
+            player.jump = 15
+    return True
+
+
+def run_scenario(name, seed=1, scale=1, autopilot=False):
+    mode, autoscroll, start_score, ticks, *bots = SCENARIOS[name]
+    started = time.perf_counter()
+    game = trainhop.TrainHop(mode, autoscroll, session=trainhop.GameSession(0, bots=bots[0] if bots else 0, scale=scale))
+    trainhop.ASSETS.finish()
+    startup_ms = round((time.perf_counter() - started) * 1000, 1) # BAKED OR NOT, SEE trainhop.py --bake
+    sim = game.sim
+    sim.highscore = 0 # NOT THE LOCAL highscores.json, SO EVERY MACHINE RUNS THE SAME LEVELS
+    sim.reset(seed)
+    sim.score = start_score
+    game.rewind.clear() # SNAPSHOTS OF THE RUN sim.reset JUST REPLACED
+    inputs = random.Random(seed)
+    held = [0, 0]
+    if autopilot: # A SOAK - PLAYERS THAT CLIMB LIKE PEOPLE DO, SO LONG RUNS REACH THE HARDER TIERS
+        game.autopilots = [trainhop.Autopilot(sim, slot) for slot in range(sim.roster.count("human"))]
+    rescues = 0
+    profiler = game.profiler
+
+    frame_times = []
+    counts = {"platforms": 0, "spikes": 0, "springs": 0}
+    start = time.perf_counter()
+    for tick in range(ticks): # ONE TICK PER FRAME, THROUGH THE SAME CALLS AS TrainHop.run
+        frame_start = time.perf_counter()
+        profiler.begin_frame()
+        game.handle_events()
+        profiler.lap("events")
+        for pilot in game.autopilots:
+            pilot.think(AUTOPILOT_BUDGET / len(game.autopilots))
+        profiler.lap("autopilot")
+        if tick % 20 == 0: # EACH PLAYER HOLDS LEFT, RIGHT OR NOTHING FOR A THIRD OF A SECOND AT A TIME
+            held = [inputs.choice([0, INPUT_LEFT, INPUT_RIGHT]) for _ in range(2)]
+        game.tick(held)
+        rescues += keep_alive(sim)
+        game.render_frame()
+        entities = sim.entity_counts()
+        profiler.end_frame(1, entities)
+        frame_times.append(time.perf_counter() - frame_start)
+        for key, value in entities.items():
+            counts[key] = max(counts[key], value)
+    elapsed = time.perf_counter() - start
+
+    frame_times.sort()
+    pick = lambda q: round(frame_times[min(len(frame_times) - 1, int(len(frame_times) * q))] * 1000, 4)
+    return {"frames": ticks, "seconds": round(elapsed, 3), "fps": round(ticks / elapsed, 1),
+            "p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99), "max_ms": round(frame_times[-1] * 1000, 4),
+            "peak_rss_mb": round(peak_rss_mb(), 1), "max_entities": counts, "final_score": sim.score, "rescues": rescues,
+            "startup_ms": startup_ms}
+
+
+def run_isolated(name, seed, scale, autopilot): # ONE PROCESS PER SCENARIO SO PEAK RSS BELONGS TO THAT SCENARIO ALONE
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", name, "--seed", str(seed), "--scale", str(scale)] +
+                         (["--autopilot"] if autopilot else []), capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def compare(results, baseline, threshold): # FAIL ON fps OR p50 MORE THAN threshold WORSE, OR RSS MORE THAN threshold BIGGER
+    failures = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if result["fps"] < base["fps"] * (1 - threshold):
+            failures.append(f"{name}: {result['fps']} fps vs baseline {base['fps']}")
+        if result["p50_ms"] > base["p50_ms"] * (1 + threshold):
+            failures.append(f"{name}: p50 {result['p50_ms']} ms vs baseline {base['p50_ms']}")
+        if result["peak_rss_mb"] > base["peak_rss_mb"] * (1 + threshold):
+            failures.append(f"{name}: peak RSS {result['peak_rss_mb']} MB vs baseline {base['peak_rss_mb']}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark trainhop.py over scripted headless scenarios.")
+    parser.add_argument("scenarios", nargs="*", help=f"scenarios to run (default: all of {', '.join(SCENARIOS)})")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--scale", type=float, default=1, help="internal render resolution, as in trainhop.py --scale")
+    parser.add_argument("--autopilot", action="store_true", help="humans played by trainhop.Autopilot instead of random input, for soak tests")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed slowdown as a fraction of the baseline")
+    parser.add_argument("--update-baseline", action="store_true", help="write these results as the new baseline")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child: # WORKER PROCESS - PRINT ONE RESULT AS JSON
+        print(json.dumps(run_scenario(args.child, args.seed, args.scale, args.autopilot)))
+        return
+
+    names = args.scenarios or list(SCENARIOS)
+    results = {}
+    for name in names:
+        result = run_isolated(name, args.seed, args.scale, args.autopilot)
+        if args.autopilot: # NOT COMPARABLE WITH RANDOM-INPUT RESULTS, SO KEPT UNDER ITS OWN NAME
+            name += "+autopilot"
+        results[name] = result
+        print(f"{name:<28} {result['fps']:>9.1f} fps  p50 {result['p50_ms']:.3f} ms  p99 {result['p99_ms']:.3f} ms  "
+              f"rss {result['peak_rss_mb']:.1f} MB  entities {result['max_entities']}  score {result['final_score']}  rescues {result['rescues']}  startup {result['startup_ms']:.0f} ms")
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"baseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}, run with --update-baseline to create one")
+        return
+    with open(args.baseline) as f:
+        failures = compare(results, json.load(f), args.threshold)
+    for failure in failures:
+        print("FAIL", failure)
+    print("PASS" if not failures else f"{len(failures)} regression(s)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+import os
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1") # ONE BANNER PER WORKER PROCESS OTHERWISE
+
+import argparse
+import hashlib
+import inspect
+import json
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import trainhop
+from trainhop import (LevelGenerator, Player, SCREEN_WIDTH, GRAVITY_STEP, INPUT_RIGHT,
+                      PLAYER_WIDTH, PLAYER_HEIGHT, PLATFORM_WIDTH, PLATFORM_HEIGHT, SPIKE_SIZE, CHUNK_PLATFORMS)
+
+
+# HOW FAR A PLAYER CAN GET FROM ONE PLATFORM TO THE NEXT, USING THE REAL Player.update.
+# A BOUNCE STARTS WITH THE PLAYER'S FEET ON THE PLATFORM; A LANDING IS ANY FALLING TICK WHOSE SWEEP PASSES THROUGH THE PLATFORM.
+# HORIZONTAL REACH ASSUMES THE PLAYER IS ALREADY AT FULL SPEED, SO A SECTION IT CALLS IMPOSSIBLE REALLY IS.
+
+TIERS = { # NAME: SCORE RANGE, MATCHING THE RULES IN LevelGenerator.__next__
+    "tier1": (0, 30000),
+    "tier2": (30000, 100000),
+    "tier3": (100000, 300000),
+}
+CLIMB_CAP = 400000 # A PERFECT-PLAY CLIMB THAT GETS THIS HIGH COUNTS AS ENDLESS
+WRAP = SCREEN_WIDTH + 50 # Player.update WRAPS x BETWEEN -50 AND SCREEN_WIDTH
+CACHE_DIR = ".levelcheck-cache"
+
+
+def jump_table(): # REACH[gap] = HOW FAR SIDEWAYS A JUMP CAN GO AND STILL LAND ON A PLATFORM gap PX HIGHER, -1 IF IT CAN'T
+    player = Player(0, 0)
+    player.jump = 15
+    player.xmovement = 9 # TOP SPEED - (9 + 1) * 0.9 == 9
+    arc = []
+    while player.y < PLATFORM_HEIGHT + PLAYER_HEIGHT: # UNTIL THE PLAYER FALLS BACK PAST ITS OWN PLATFORM
+        player.update(INPUT_RIGHT)
+        if player.gravity: # Simulation.updatePlatforms ONLY LANDS FALLING PLAYERS
+            arc.append((player.prev_y, player.y, player.x))
+    peak = -min(y for y, _, _ in arc)
+    reach = [-1] * (int(peak) + PLATFORM_HEIGHT + PLAYER_HEIGHT + 1)
+    for gap in range(len(reach)):
+        for y0, y1, x in arc: # FEET START ON THE LOWER PLATFORM, SO THE PLAYER'S TOP IS AT -PLAYER_HEIGHT
+            if min(y0, y1) - PLAYER_HEIGHT < -gap + PLATFORM_HEIGHT and max(y0, y1) - PLAYER_HEIGHT > -gap - PLAYER_HEIGHT:
+                reach[gap] = max(reach[gap], x)
+    while reach and reach[-1] < 0:
+        reach.pop()
+    return reach
+
+
+REACH = jump_table()
+MAX_GAP = len(REACH) - 1
+
+
+def landing(platform, spike): # RANGES OF PLAYER x THAT TOUCH THE PLATFORM, LESS ANY THAT TOUCH ITS SPIKE'S TIP
+    left, right = platform.x - PLAYER_WIDTH, platform.x + PLATFORM_WIDTH - 10
+    if spike is None:
+        return [(left, right)]
+    tip = int(spike.x + SPIKE_SIZE / 4)
+    return [(left, tip - PLAYER_WIDTH), (tip + int(SPIKE_SIZE * 0.25), right)]
+
+
+def can_reach(a, b): # a AND b ARE (y, RANGES) WITH b HIGHER
+    gap = a[0] - b[0]
+    if gap > MAX_GAP or REACH[gap] < 0:
+        return False
+    for a_left, a_right in a[1]:
+        for b_left, b_right in b[1]:
+            for shift in (-WRAP, 0, WRAP):
+                if max(0, b_left + shift - a_right, a_left - b_right - shift) <= REACH[gap]:
+                    return True
+    return False
+
+
+class Climb: # PERFECT-PLAY PROGRESS UP A STREAM OF PLATFORMS, ONLY KEEPING THOSE WITHIN ONE JUMP OF THE TOP
+    def __init__(self, platform):
+        self.restart(platform)
+        self.best = platform.y # HIGHEST REACHABLE PLATFORM
+
+    def add(self, platform, spike): # FALSE ONCE NOTHING WITHIN ONE JUMP OF THE TOP IS REACHABLE
+        point = (platform.y, landing(platform, spike))
+        reachable = any(can_reach(entry, point) for entry in self.frontier)
+        self.frontier = [entry for entry in self.frontier if entry[0] - platform.y <= MAX_GAP]
+        if reachable:
+            self.frontier.append(point)
+            self.best = platform.y
+        return bool(self.frontier)
+
+    def restart(self, platform): # SKIP PAST AN IMPOSSIBLE SECTION
+        self.frontier = [(platform.y, landing(platform, None))]
+
+
+def analyse_tier(tier, seed, chunks): # WORKER - chunks LEVEL SECTIONS WITH SCORES SPREAD OVER THE TIER
+    low, high = TIERS[tier]
+    pick = random.Random(f"{seed}:{tier}")
+    level = LevelGenerator(seed)
+    level.opening()
+    bottom = level.top
+    climb = Climb(trainhop.Platform(SCREEN_WIDTH // 2, level.top, 0))
+    stats = {"chunks": chunks, "impossible": 0, "platforms": 0, "spikes": 0, "springs": 0, "reds": 0, "height": 0, "max_gap": 0}
+    for _ in range(chunks):
+        level.score = pick.randrange(low, high)
+        start = level.top
+        stuck = False
+        for platform, spring, spike in next(level):
+            gap = start - platform.y
+            start = platform.y
+            stats["max_gap"] = max(stats["max_gap"], gap)
+            stats["spikes"] += spike is not None
+            stats["springs"] += spring is not None
+            stats["reds"] += platform.kind == 2
+            if not climb.add(platform, spike):
+                stuck = True
+                climb.restart(platform)
+        stats["platforms"] += CHUNK_PLATFORMS
+        stats["impossible"] += stuck
+    stats["height"] = bottom - level.top
+    return tier, stats
+
+
+def analyse_climbs(seed, runs): # WORKER - WHERE A PERFECT PLAYER GETS STUCK ON A FRESH LEVEL, SCORE GROWING AS IT CLIMBS
+    scores = []
+    for run in range(runs):
+        level = LevelGenerator(f"{seed}:{run}")
+        opening = level.opening()
+        climb = Climb(opening[-1][0])
+        stuck = False
+        while not stuck and -climb.best < CLIMB_CAP:
+            level.score = max(0, -int(climb.best))
+            for platform, _, spike in next(level):
+                if not climb.add(platform, spike):
+                    stuck = True
+                    break
+        scores.append(max(0, -int(climb.best)))
+    return scores
+
+
+def cache_key(args): # ANYTHING THAT CHANGES THE LEVELS OR THE JUMP CHANGES THE KEY
+    parts = [inspect.getsource(LevelGenerator), inspect.getsource(Player.update), inspect.getsource(trainhop.Platform),
+             inspect.getsource(trainhop.Spike), inspect.getsource(jump_table), inspect.getsource(landing),
+             inspect.getsource(can_reach), inspect.getsource(Climb), inspect.getsource(trainhop.swept_hit), repr((SCREEN_WIDTH, GRAVITY_STEP, PLAYER_WIDTH, PLAYER_HEIGHT, PLATFORM_WIDTH,
+             PLATFORM_HEIGHT, CHUNK_PLATFORMS, TIERS, CLIMB_CAP)), repr((args.chunks, args.runs, args.seed, args.batch))]
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()[:16]
+
+
+def analyse(args):
+    results = {"max_gap": MAX_GAP, "tiers": {}, "climbs": []}
+    with ProcessPoolExecutor(args.jobs) as pool:
+        jobs = []
+        for tier in TIERS:
+            for start in range(0, args.chunks, args.batch):
+                jobs.append(pool.submit(analyse_tier, tier, f"{args.seed}:{start}", min(args.batch, args.chunks - start)))
+        climb_batch = max(1, args.batch // 100)
+        climbs = [pool.submit(analyse_climbs, f"{args.seed}:{start}", min(climb_batch, args.runs - start))
+                  for start in range(0, args.runs, climb_batch)]
+        for job in jobs:
+            tier, stats = job.result()
+            total = results["tiers"].setdefault(tier, dict.fromkeys(stats, 0))
+            for key, value in stats.items():
+                total[key] = max(total[key], value) if key == "max_gap" else total[key] + value
+        for job in climbs:
+            results["climbs"] += job.result()
+    return results
+
+
+def percentile(values, q):
+    return values[min(len(values) - 1, int(len(values) * q))] if values else 0
+
+
+def report(results):
+    print(f"max reachable gap: {results['max_gap']} px (jump 15, gravity {GRAVITY_STEP})")
+    print(f"{'tier':<6} {'sections':>9} {'impossible':>11} {'spikes/plat':>12} {'spikes/1000px':>14} {'reds':>6} {'max gap':>8}")
+    for tier, stats in results["tiers"].items():
+        print(f"{tier:<6} {stats['chunks']:>9} {stats['impossible'] / stats['chunks']:>11.3%} {stats['spikes'] / stats['platforms']:>12.3f} "
+              f"{stats['spikes'] * 1000 / max(stats['height'], 1):>14.2f} {stats['reds'] / stats['platforms']:>6.1%} {stats['max_gap']:>8}")
+
+    scores = sorted(results["climbs"])
+    if not scores:
+        return
+    print(f"\nperfect-play score ceiling over {len(scores)} levels: p10 {percentile(scores, 0.1)}  p50 {percentile(scores, 0.5)}  "
+          f"p90 {percentile(scores, 0.9)}  endless {sum(s >= CLIMB_CAP for s in scores) / len(scores):.1%}")
+    for tier, (low, high) in TIERS.items():
+        ended = sum(low <= s < high for s in scores)
+        print(f"  stuck in {tier}: {ended / len(scores):.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check generated Train Hop levels for unreachable gaps, per difficulty tier.")
+    parser.add_argument("--chunks", type=int, default=200000, help=f"level sections ({CHUNK_PLATFORMS} platforms each) per tier")
+    parser.add_argument("--runs", type=int, default=2000, help="whole levels climbed for the score ceiling")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--batch", type=int, default=20000, help="sections per worker task")
+    parser.add_argument("--no-cache", action="store_true")
+    args = parser.parse_args()
+
+    path = os.path.join(CACHE_DIR, cache_key(args) + ".json")
+    if not args.no_cache and os.path.exists(path):
+        with open(path) as f:
+            results = json.load(f)
+        print(f"cached: {path}")
+    else:
+        start = time.perf_counter()
+        results = analyse(args)
+        print(f"{args.chunks * len(TIERS)} sections and {args.runs} climbs in {time.perf_counter() - start:.1f}s")
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(results, f)
+    report(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,491 @@
+import argparse
+import asyncio
+import random
+import struct
+import sys
+import threading
+import time
+from collections import deque
+
+import pygame
+
+from trainhop import (Simulation, TrainHop, GameSession, Platform, Spike, Spring, HIGHSCORES, TEXT, present_ui,
+                      FPS, TICK_SECONDS, SCREEN_WIDTH, SCREEN_HEIGHT, INPUT_LEFT, INPUT_RIGHT)
+
+
+# ONLINE MULTIPLAYER. THE HOST RUNS THE REAL Simulation AND IS THE ONLY ONE WHOSE RESULT COUNTS.
+# CLIENTS SEND THEIR INPUT EVERY TICK AND GET A SNAPSHOT EVERY SNAPSHOT_EVERY TICKS, DELTA-ENCODED AGAINST THE
+# LAST SNAPSHOT THEY ACKNOWLEDGED. EACH CLIENT KEEPS SIMULATING LOCALLY AND, WHEN A SNAPSHOT ARRIVES, ROLLS BACK
+# TO IT AND REPLAYS THE INPUTS THE HOST HAS NOT SEEN YET.
+
+PORT = 4711
+SNAPSHOT_EVERY = 3 # 20 SNAPSHOTS A SECOND
+INPUT_REDUNDANCY = 8 # EACH INPUT PACKET REPEATS THIS MANY TICKS, SO A LOST PACKET COSTS NOTHING
+HISTORY = 64 # TICKS OF SNAPSHOTS KEPT FOR DELTA BASES
+INPUT_SLACK = 8 # A CLIENT FURTHER AHEAD OF THE HOST THAN THIS HAS ITS OLDEST INPUTS DROPPED
+HELLO_EVERY = 0.5 # SECONDS BETWEEN HELLOS UNTIL THE HOST ANSWERS
+CLIENT_TIMEOUT = 5 # SECONDS OF SILENCE BEFORE THE HOST FREES A SLOT
+
+HELLO, WELCOME, INPUT, SNAPSHOT = 1, 2, 3, 4
+
+WELCOME_PACKET = struct.Struct("<BBIQBB") # TYPE, SLOT, SEED, HIGHSCORE, AUTOSCROLL, PLAYERS
+INPUT_HEADER = struct.Struct("<BIIB") # TYPE, SEQ OF THE NEWEST INPUT, NEWEST SNAPSHOT TICK RECEIVED, INPUT COUNT
+SNAPSHOT_HEADER = struct.Struct("<BIIIqdBIBB") # TYPE, TICK, BASE TICK, INPUT ACK, SCORE, CAMERAY, FLAGS, SPAWNED, PLAYERS, PLATFORMS
+PLAYER_RECORD = struct.Struct("<fffffBB") # X, Y, JUMP, GRAVITY, XMOVEMENT, DIRECTION, LAST INPUT
+PLATFORM_RECORD = struct.Struct("<BBf") # SLOT IN platforms, STATE (| NEW_PLATFORM), X
+PLATFORM_EXTRA = struct.Struct("<fBf") # Y, KIND, SPEED - ONLY FOR PLATFORMS THE BASE DIDN'T HAVE
+SPRING_RECORD = struct.Struct("<ffB")
+SPIKE_RECORD = struct.Struct("<ff")
+NEW_PLATFORM = 0x80
+
+GAME_OVER = 1 # SNAPSHOT FLAGS
+HAS_SPRINGS = 2
+HAS_SPIKES = 4
+
+
+def capture(sim, inputs): # THE PARTS OF A Simulation CLIENTS NEED, AS PLAIN TUPLES
+    return {"tick": sim.ticks, "score": sim.score, "cameray": sim.cameray, "game_over": sim.game_over, "spawned": sim.spawned,
+            "players": [(p.x, p.y, p.jump, p.gravity, p.xmovement, p.direction, bits) for p, bits in zip(sim.players, inputs)],
+            "platforms": {sim.spawned + i: (p.x, p.y, p.kind, p.state, p.speed) for i, p in enumerate(sim.platforms)},
+            "springs": [(s.x, s.y, s.state) for s in sim.springs],
+            "spikes": [(s.x, s.y) for s in sim.spikes]}
+
+
+def restore(sim, state): # PUT A CAPTURED STATE BACK INTO A Simulation
+    for player, (x, y, jump, gravity, xmovement, direction, _) in zip(sim.players, state["players"]):
+        player.x = player.prev_x = x
+        player.y = player.prev_y = y
+        player.jump, player.gravity, player.xmovement, player.direction = jump, gravity, xmovement, direction
+    sim.platforms.clear()
+    for key in sorted(state["platforms"]):
+        x, y, kind, platform_state, speed = state["platforms"][key]
+        sim.platforms.append(Platform(x, y, kind, platform_state, speed))
+    sim.springs.clear()
+    for x, y, spring_state in state["springs"]:
+        spring = Spring(x, y)
+        spring.state = spring_state
+        sim.springs.append(spring)
+    sim.spikes.clear()
+    sim.spikes.extend(Spike(x, y) for x, y in state["spikes"])
+    sim.score = state["score"]
+    sim.cameray = sim.prev_cameray = state["cameray"]
+    sim.spawned = state["spawned"]
+    sim.reindex()
+
+
+def encode_snapshot(state, base, ack): # ONLY WHAT CHANGED SINCE base - A FULL SNAPSHOT WHEN base IS None
+    base_platforms = base["platforms"] if base else {}
+    platforms = []
+    for key, record in state["platforms"].items():
+        old = base_platforms.get(key)
+        if old is None:
+            x, y, kind, platform_state, speed = record
+            platforms.append(PLATFORM_RECORD.pack(key - state["spawned"], platform_state | NEW_PLATFORM, x) + PLATFORM_EXTRA.pack(y, kind, speed))
+        elif old != record:
+            platforms.append(PLATFORM_RECORD.pack(key - state["spawned"], record[3], record[0]))
+
+    flags = GAME_OVER if state["game_over"] else 0
+    tail = []
+    if not base or base["springs"] != state["springs"]:
+        flags |= HAS_SPRINGS
+        tail.append(bytes([len(state["springs"])]) + b"".join(SPRING_RECORD.pack(*s) for s in state["springs"]))
+    if not base or base["spikes"] != state["spikes"]:
+        flags |= HAS_SPIKES
+        tail.append(bytes([len(state["spikes"])]) + b"".join(SPIKE_RECORD.pack(*s) for s in state["spikes"]))
+
+    header = SNAPSHOT_HEADER.pack(SNAPSHOT, state["tick"], base["tick"] if base else 0, ack, state["score"], state["cameray"],
+                                  flags, state["spawned"], len(state["players"]), len(platforms))
+    return header + b"".join(PLAYER_RECORD.pack(*p) for p in state["players"]) + b"".join(platforms) + b"".join(tail)
+
+
+def decode_snapshot(data, bases): # RETURNS (STATE, ACK), OR None IF THE BASE IT NEEDS IS GONE
+    _, tick, base_tick, ack, score, cameray, flags, spawned, player_count, platform_count = SNAPSHOT_HEADER.unpack_from(data)
+    base = bases.get(base_tick) if base_tick else None
+    if base_tick and base is None:
+        return None
+    offset = SNAPSHOT_HEADER.size
+    players = []
+    for _ in range(player_count):
+        players.append(PLAYER_RECORD.unpack_from(data, offset))
+        offset += PLAYER_RECORD.size
+    platforms = {key: record for key, record in base["platforms"].items() if key >= spawned} if base else {}
+    for _ in range(platform_count):
+        slot, platform_state, x = PLATFORM_RECORD.unpack_from(data, offset)
+        offset += PLATFORM_RECORD.size
+        if platform_state & NEW_PLATFORM:
+            y, kind, speed = PLATFORM_EXTRA.unpack_from(data, offset)
+            offset += PLATFORM_EXTRA.size
+        else:
+            _, y, kind, _, speed = platforms[spawned + slot]
+        platforms[spawned + slot] = (x, y, kind, platform_state & ~NEW_PLATFORM, speed)
+    springs, spikes = (base["springs"], base["spikes"]) if base else ([], [])
+    if flags & HAS_SPRINGS:
+        springs = [SPRING_RECORD.unpack_from(data, offset + 1 + i * SPRING_RECORD.size) for i in range(data[offset])]
+        offset += 1 + data[offset] * SPRING_RECORD.size
+    if flags & HAS_SPIKES:
+        spikes = [SPIKE_RECORD.unpack_from(data, offset + 1 + i * SPIKE_RECORD.size) for i in range(data[offset])]
+    return {"tick": tick, "score": score, "cameray": cameray, "game_over": bool(flags & GAME_OVER), "spawned": spawned,
+            "players": players, "platforms": platforms, "springs": springs, "spikes": spikes}, ack
+
+
+class RemotePlayer: # ONE CONNECTED CLIENT, AS THE HOST SEES IT
+    def __init__(self, addr, slot):
+        self.addr = addr
+        self.slot = slot
+        self.ready = True
+        self.seen = time.monotonic()
+        self.reset()
+
+    def reset(self): # NEW RUN, SEQ STARTS AGAIN AT 1
+        self.inputs = {} # SEQ: BITS, NOT YET APPLIED
+        self.received = 0 # NEWEST SEQ SEEN
+        self.applied = 0 # NEWEST SEQ THE SIMULATION HAS USED
+        self.last = 0 # REPEATED WHILE THE NEXT INPUT HASN'T ARRIVED
+        self.acked = 0 # NEWEST SNAPSHOT TICK THE CLIENT HAS
+
+    def next_input(self):
+        if self.received - self.applied > INPUT_SLACK: # CLIENT IS TOO FAR AHEAD, CATCH UP
+            self.applied = self.received - INPUT_SLACK
+        bits = self.inputs.pop(self.applied + 1, None)
+        if bits is not None:
+            self.applied += 1
+            self.last = bits
+        for seq in [seq for seq in self.inputs if seq <= self.applied]:
+            del self.inputs[seq]
+        return self.last
+
+
+class Host(asyncio.DatagramProtocol): # AUTHORITATIVE - RUNS THE GAME FOR players CLIENTS AND STARTS A NEW RUN WHEN ALL ARE READY AGAIN
+    def __init__(self, players=2, autoscroll=False):
+        self.players = players
+        self.mode = "singleplayer" if players == 1 else "multiplayer" # ONE PLAYER GETS THE SOLO RULES, NOT A TEAM WITH AN EMPTY SLOT
+        self.autoscroll = autoscroll
+        self.clients = {} # ADDR: RemotePlayer
+        self.sim = None
+        self.history = {}
+        self.transport = None
+        self.sent = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        if not data:
+            return
+        client = self.clients.get(addr)
+        if client is not None:
+            client.seen = time.monotonic()
+        if data[0] == HELLO:
+            if client is None:
+                free = sorted(set(range(self.players)) - {c.slot for c in self.clients.values()})
+                if not free:
+                    return # FULL
+                client = self.clients[addr] = RemotePlayer(addr, free[0])
+                print(f"player {client.slot + 1} joined from {addr[0]}:{addr[1]}")
+            if self.sim is not None and not self.sim.game_over:
+                self.welcome(client) # IT MISSED THE WELCOME
+            else:
+                client.ready = True
+                if len(self.clients) == self.players and all(c.ready for c in self.clients.values()):
+                    self.start()
+        elif data[0] == INPUT and client is not None:
+            _, seq, acked, count = INPUT_HEADER.unpack_from(data)
+            client.acked = max(client.acked, acked)
+            for i, bits in enumerate(data[INPUT_HEADER.size:INPUT_HEADER.size + count]):
+                input_seq = seq - count + 1 + i
+                if input_seq > client.applied:
+                    client.inputs[input_seq] = bits
+            client.received = max(client.received, seq)
+
+    def start(self):
+        self.sim = Simulation(self.mode, self.autoscroll, HIGHSCORES.best(self.mode))
+        self.history.clear()
+        for client in self.clients.values():
+            client.reset()
+            client.ready = False
+            self.welcome(client)
+        print(f"run started, seed {self.sim.seed}")
+
+    def welcome(self, client):
+        self.send(WELCOME_PACKET.pack(WELCOME, client.slot, self.sim.seed, self.sim.highscore, self.autoscroll, self.players), client.addr)
+
+    def send(self, data, addr):
+        self.transport.sendto(data, addr)
+        self.sent += len(data)
+
+    def drop_silent(self):
+        for addr, client in list(self.clients.items()):
+            if time.monotonic() - client.seen > CLIENT_TIMEOUT:
+                del self.clients[addr]
+                print(f"player {client.slot + 1} left")
+
+    def tick(self):
+        clients = sorted(self.clients.values(), key=lambda c: c.slot)
+        inputs = [0] * len(self.sim.players) # AN EMPTY SLOT STANDS STILL
+        for client in clients:
+            inputs[client.slot] = client.next_input()
+        self.sim.step(*inputs)
+        state = self.history[self.sim.ticks] = capture(self.sim, inputs)
+        self.history.pop(self.sim.ticks - HISTORY, None)
+        if self.sim.ticks % SNAPSHOT_EVERY == 0 or self.sim.game_over:
+            for client in clients:
+                self.send(encode_snapshot(state, self.history.get(client.acked), client.applied), client.addr)
+        if self.sim.game_over:
+            print(f"run over, score {self.sim.score}")
+
+    async def serve(self, port):
+        loop = asyncio.get_running_loop()
+        await loop.create_datagram_endpoint(lambda: self, local_addr=("0.0.0.0", port))
+        print(f"hosting on port {port}, waiting for {self.players} players")
+        next_tick = loop.time()
+        while True:
+            self.drop_silent()
+            if self.sim is not None and not self.sim.game_over:
+                self.tick()
+            elif self.sim is not None and round(loop.time() / TICK_SECONDS) % 30 == 0: # KEEP TELLING CLIENTS THE RUN IS OVER
+                final = encode_snapshot(self.history[self.sim.ticks], None, 0)
+                for client in self.clients.values():
+                    if not client.ready:
+                        self.send(final, client.addr)
+            next_tick = max(next_tick + TICK_SECONDS, loop.time() - TICK_SECONDS * 5) # DON'T RACE TO CATCH UP AFTER A STALL
+            await asyncio.sleep(next_tick - loop.time())
+
+
+class Link(asyncio.DatagramProtocol): # CLIENT SOCKET, WITH OPTIONAL ADDED LATENCY AND LOSS FOR TESTING
+    def __init__(self, client):
+        self.client = client
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.client.delay(self.client.received.append, data)
+
+
+class NetClient: # THE NETWORK SIDE OF A CLIENT, ON ITS OWN THREAD SO THE GAME LOOP NEVER WAITS ON A SOCKET
+    def __init__(self, host, port=PORT, lag=0, loss=0):
+        self.addr = (host, port)
+        self.lag = lag / 2000 # ONE WAY, SECONDS
+        self.loss = loss
+        self.received = deque()
+        self.link = Link(self)
+        self.loop = asyncio.new_event_loop()
+        self.chaos = random.Random()
+        self.sent = self.downloaded = 0
+        ready = threading.Event()
+        threading.Thread(target=self.run, args=(ready,), daemon=True).start()
+        ready.wait()
+
+    def run(self, ready):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self.loop.create_datagram_endpoint(lambda: self.link, remote_addr=self.addr))
+        ready.set()
+        self.loop.run_forever()
+
+    def delay(self, action, data): # RUNS ON THE NETWORK THREAD
+        if self.loss and self.chaos.random() < self.loss:
+            return
+        if self.lag:
+            self.loop.call_later(self.lag, action, data)
+        else:
+            action(data)
+
+    def send(self, data):
+        self.sent += len(data)
+        self.loop.call_soon_threadsafe(self.delay, self.link.transport.sendto, data)
+
+    def poll(self):
+        while self.received:
+            data = self.received.popleft()
+            self.downloaded += len(data)
+            yield data
+
+    def join(self, timeout=None): # HELLO UNTIL WELCOMED, RETURNS (SLOT, SEED, HIGHSCORE, AUTOSCROLL, MODE) OR None ON TIMEOUT
+        start = time.perf_counter()
+        while timeout is None or time.perf_counter() - start < timeout:
+            self.send(bytes([HELLO]))
+            wait = time.perf_counter() + HELLO_EVERY
+            while time.perf_counter() < wait:
+                for data in self.poll():
+                    if data[0] == WELCOME:
+                        _, slot, seed, highscore, autoscroll, players = WELCOME_PACKET.unpack(data)
+                        return slot, seed, highscore, bool(autoscroll), "singleplayer" if players == 1 else "multiplayer"
+                if pygame.display.get_init(): # KEEP THE WINDOW RESPONSIVE WHILE WAITING
+                    pygame.event.pump()
+                time.sleep(0.01)
+        return None
+
+
+class NetSimulation(Simulation): # CLIENT-SIDE PREDICTION - THE HOST'S PLATFORMS, LOCAL INPUT AHEAD OF THE HOST, ROLLED BACK ON EACH SNAPSHOT
+    def __init__(self, client, slot, seed, highscore, autoscroll, mode="multiplayer"):
+        self.client = client
+        self.slot = slot
+        super().__init__(mode, autoscroll, highscore, seed) # THE HOST'S MODE, SO PREDICTION FOLLOWS THE SAME RULES
+
+    def reset(self, seed=None):
+        super().reset(seed)
+        self.seq = 0
+        self.sent = deque(maxlen=INPUT_REDUNDANCY)
+        self.unacked = deque() # (SEQ, BITS) THE HOST HASN'T APPLIED YET
+        self.snapshots = {}
+        self.newest = 0
+        self.host_over = False
+        self.remote = [0] * len(self.players) # LAST INPUT SEEN FOR EVERY PLAYER
+        self.predicted = {} # SEQ: LOCAL PLAYER (x, y), TO MEASURE CORRECTIONS
+        self.error = 0 # LAST CORRECTION IN PX
+
+    def prefetch(self): # PLATFORMS COME FROM THE HOST
+        pass
+
+    def spawnPlatforms(self):
+        pass
+
+    def inputs_for(self, bits):
+        inputs = list(self.remote)
+        inputs[self.slot] = bits
+        return inputs
+
+    def step(self, p1_input=0, p2_input=0): # EITHER KEY SET MOVES THIS CLIENT'S PLAYER
+        bits = p1_input | p2_input
+        self.seq += 1
+        self.sent.append(bits)
+        self.unacked.append((self.seq, bits))
+        self.client.send(INPUT_HEADER.pack(INPUT, self.seq, self.newest, len(self.sent)) + bytes(self.sent))
+        self.reconcile()
+        self.game_over = False # THE HOST DECIDES WHEN THE RUN ENDS
+        super().step(*self.inputs_for(bits))
+        player = self.players[self.slot]
+        self.predicted[self.seq] = (player.x, player.y)
+        self.game_over = self.host_over
+        return self.game_over
+
+    def reconcile(self): # ROLL BACK TO THE NEWEST SNAPSHOT AND REPLAY WHAT THE HOST HASN'T SEEN
+        latest = None
+        for data in self.client.poll():
+            if data[0] != SNAPSHOT:
+                continue
+            decoded = decode_snapshot(data, self.snapshots)
+            if decoded is None:
+                continue
+            state, ack = decoded
+            self.snapshots[state["tick"]] = state
+            if state["tick"] > self.newest:
+                self.newest = state["tick"]
+                latest = state, ack
+        if latest is None:
+            return
+        for tick in [tick for tick in self.snapshots if tick <= self.newest - HISTORY]:
+            del self.snapshots[tick]
+        state, ack = latest
+        while self.unacked and self.unacked[0][0] <= ack:
+            self.unacked.popleft()
+        self.remote = [record[6] for record in state["players"]]
+        self.host_over = state["game_over"]
+        predicted = self.predicted.pop(ack, None)
+        x, y = state["players"][self.slot][:2]
+        if predicted:
+            self.error = abs(predicted[0] - x) + abs(predicted[1] - y)
+        for seq in [seq for seq in self.predicted if seq <= ack]:
+            del self.predicted[seq]
+        restore(self, state)
+        self.ticks = state["tick"]
+        self.inputs.clear() # ONLY THE HOST'S RECORDING COUNTS
+        self.game_over = False
+        for seq, bits in self.unacked: # REPLAY - THE LAST ONE IS THE CURRENT TICK'S, STEPPED BY step() ITSELF
+            if seq == self.seq:
+                break
+            super().step(*self.inputs_for(bits))
+            player = self.players[self.slot]
+            self.predicted[seq] = (player.x, player.y)
+
+
+class OnlineGame(TrainHop): # THE NORMAL GAME WINDOW, DRIVEN BY A NetSimulation
+    CAN_REWIND = False # THE HOST OWNS THE TIMELINE
+
+    def __init__(self, client, session):
+        self.client = client
+        super().__init__("multiplayer", False, session=session)
+
+    def setup_players(self):
+        self.sim = None
+
+    def reset_game_state(self):
+        self.screen.fill((255, 255, 255))
+        text = TEXT.render(self.font, "Waiting for the other players...", (0, 0, 0))
+        self.screen.blit(text, ((SCREEN_WIDTH - text.get_width()) // 2, SCREEN_HEIGHT // 2))
+        present_ui(self.screen)
+        slot, seed, highscore, autoscroll, mode = self.client.join()
+        pygame.display.set_caption(f"Train Hop - Online, player {slot + 1}")
+        self.mode = mode # SINGLEPLAYER ALSO TAKES BOTH KEY SETS, AS IN THE LOCAL GAME
+        self.autoscroll = autoscroll
+        self.sim = NetSimulation(self.client, slot, seed, highscore, autoscroll, mode)
+        self.sim.profiler = self.profiler
+        self.highscore = highscore
+        self.game_over = False
+        self.game_over_choice = None
+
+    def finish_run(self): # THE HOST KEEPS THE RESULT, THERE IS NO LOCAL REPLAY
+        self.highscore = max(self.highscore, self.score)
+
+
+def run_bot(args): # HEADLESS CLIENT WITH RANDOM INPUT - FOR LOOPBACK TESTS, PRINTS BANDWIDTH AND PREDICTION ERROR
+    client = NetClient(args.address, args.port, args.lag, args.loss)
+    joined = client.join(timeout=10)
+    if joined is None:
+        sys.exit("no answer from the host")
+    slot, seed, highscore, autoscroll, mode = joined
+    sim = NetSimulation(client, slot, seed, highscore, autoscroll, mode)
+    print(f"joined as player {slot + 1}, seed {seed}")
+    rng = random.Random(args.seed)
+    held = 0
+    errors = []
+    start = next_tick = time.perf_counter()
+    while sim.seq < args.ticks and not sim.game_over:
+        if sim.ticks % 20 == 0:
+            held = rng.choice([0, INPUT_LEFT, INPUT_RIGHT])
+        sim.step(held)
+        errors.append(sim.error)
+        next_tick += TICK_SECONDS
+        time.sleep(max(0, next_tick - time.perf_counter()))
+    elapsed = time.perf_counter() - start
+    errors.sort()
+    print(f"{sim.seq} ticks in {elapsed:.1f}s, score {sim.score}, game over {sim.game_over}")
+    print(f"down {client.downloaded / elapsed / 1024:.2f} KB/s  up {client.sent / elapsed / 1024:.2f} KB/s  "
+          f"correction p50 {errors[len(errors) // 2]:.1f} px  p99 {errors[int(len(errors) * 0.99)]:.1f} px")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play Train Hop multiplayer over the network.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    host = sub.add_parser("host", help="run the authoritative game (no window)")
+    host.add_argument("--players", type=int, default=2, choices=[1, 2])
+    host.add_argument("--autoscroll", action="store_true")
+    host.add_argument("--port", type=int, default=PORT)
+    for name, text in (("join", "play in a window"), ("bot", "headless random-input client, for testing")):
+        client = sub.add_parser(name, help=text)
+        client.add_argument("address", nargs="?", default="127.0.0.1")
+        client.add_argument("--port", type=int, default=PORT)
+        client.add_argument("--lag", type=float, default=0, help="added round trip latency in ms")
+        client.add_argument("--loss", type=float, default=0, help="fraction of packets dropped each way")
+        if name == "bot":
+            client.add_argument("--ticks", type=int, default=FPS * 30)
+            client.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.command == "host":
+        try:
+            asyncio.run(Host(args.players, args.autoscroll).serve(args.port))
+        except KeyboardInterrupt:
+            pass
+    elif args.command == "bot":
+        run_bot(args)
+    else:
+        session = GameSession()
+        game = OnlineGame(NetClient(args.address, args.port, args.lag, args.loss), session)
+        while game.run() == "retry":
+            game.start(game.mode, game.autoscroll)
+
+
+if __name__ == "__main__":
+    main()
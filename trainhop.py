@@ -4,37 +4,360 @@ import sys
 import random
 import os
 import json
+import threading
+import atexit
+import getpass
+import datetime
+import csv
+import subprocess
+import struct
+import zlib
+import argparse
+import time
+import bisect
+import mmap
+import ast
+import inspect
+import ctypes
+import traceback
+from collections import OrderedDict, deque
+from array import array
 
 
 SCREEN_WIDTH = 1280
 SCREEN_HEIGHT = 1024 
-FPS = 60
+FPS = 60 # SIMULATION TICKS PER SECOND - RENDERING HAS ITS OWN CAP
+TICK_SECONDS = 1 / FPS
+MAX_CATCHUP_TICKS = 5 # A SLOWER FRAME THAN THIS SLOWS THE GAME INSTEAD OF STUTTERING FORWARD
+AUTOPILOT_BUDGET = 0.002 # SECONDS OF EACH FRAME THE AUTOPILOTS MAY SPEND PLANNING, SHARED BETWEEN THEM
+IDLE_WAIT_MS = 500 # LONGEST A MENU SLEEPS IN event.wait BEFORE CHECKING WHETHER IT NEEDS A REDRAW
+ATTRACT_SECONDS = 30 # AN UNTOUCHED MAIN MENU STARTS A DEMO RUN ON AUTOPILOT AFTER THIS LONG
 GRAVITY_STEP = 0.5
-
-
-def load_highscores():
-    if os.path.exists("highscores.json"):
-        with open("highscores.json", "r") as f:
-            return json.load(f)
-    return {"singleplayer": 0, "multiplayer": 0}
-
-def save_highscores(data):
-    with open("highscores.json", "w") as f:
-        json.dump(data, f)
+SFX_VOLUME = 0.3
+
+BACKGROUND_ASSETS = [ # IN THE ORDER THEY ARE NEEDED - THE LOADER THREAD FETCHES THE MENU FIRST
+    "assets/backgrounds/mainmenubg.png",
+    "assets/backgrounds/background.png",
+]
+GAME_ASSETS = [
+    "assets/character sprites/train-a.png",
+    "assets/character sprites/train-b.png",
+    "assets/platforming/green.png",
+    "assets/platforming/blue.png",
+    "assets/platforming/red.png",
+    "assets/platforming/red_1.png",
+    "assets/platforming/red_2.png",
+    "assets/platforming/red_3.png",
+    "assets/platforming/spring.png",
+    "assets/platforming/spring_1.png",
+    "assets/platforming/spike.png",
+    "assets/sfx/boing.wav",
+    "assets/sfx/break.wav",
+    "assets/sfx/jump.wav",
+    "assets/sfx/success.wav",
+]
+ASSET_CACHE_DIR = ".asset-cache" # WRITTEN BY --bake, ONE FILE PER --scale
+ASSET_CACHE_MAGIC = b"THA1"
+ASSET_CACHE_HEADER = struct.Struct("<4sI") # MAGIC, JSON INDEX BYTES - THE INDEX FOLLOWS, THEN THE PIXELS AND SAMPLES
+ASSET_CACHE_ALIGN = 16 # EVERY BLOB STARTS ON A 16 BYTE BOUNDARY OF THE MAPPED FILE
+
+try: # HANDS FREED HEAP BACK TO THE OS - glibc KEEPS A THREAD'S FREED MEMORY IN THAT THREAD'S ARENA, SO DECODER SCRATCH ON THE LOADER THREAD WOULD STAY IN RSS
+    release_heap = ctypes.CDLL(None).malloc_trim
+except (OSError, AttributeError, TypeError): # NOT glibc (WINDOWS CAN'T EVEN OPEN None) - NOTHING TO DO
+    release_heap = lambda pad: 0
+
+
+class HighscoreStore: # RANKED TOP-N TABLES PER MODE, KEPT IN MEMORY AND WRITTEN TO DISK ON A BACKGROUND THREAD
+    MODES = ["singleplayer", "multiplayer"]
+
+    def __init__(self, path="highscores.json", top_n=10):
+        self.path = path
+        self.top_n = top_n
+        self.lock = threading.Lock()
+        self.dirty = threading.Event()
+        self.idle = threading.Event()
+        self.idle.set()
+        self.writer = None
+        self.checks = deque() # (MODE, REPLAY, DONE) WAITING FOR verify_replay ON THE WRITER THREAD
+        self.replays = deque() # (REPLAY, PATH) WAITING TO BE WRITTEN BY IT
+        self.changed = False # THE TABLES NEED WRITING
+        self.tables = self.load()
+
+    def load(self): # READ ONCE AT STARTUP. OLD FILES HELD ONE INTEGER PER MODE
+        tables = {mode: [] for mode in self.MODES}
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError): # MISSING OR UNREADABLE - WRITES GO THROUGH A RENAME, SO THIS IS NEVER A HALF-WRITTEN FILE
+            return tables
+        for mode, entries in data.items():
+            if isinstance(entries, int):
+                entries = [{"score": entries, "name": "", "date": "", "seed": None, "autoscroll": False}] if entries > 0 else []
+            tables[mode] = sorted(entries, key=lambda e: -e["score"])[:self.top_n]
+        return tables
+
+    def best(self, mode):
+        table = self.tables.get(mode)
+        return table[0]["score"] if table else 0
+
+    def table(self, mode):
+        return self.tables.get(mode, [])
+
+    def qualifies(self, mode, score):
+        table = self.table(mode)
+        return score > 0 and (len(table) < self.top_n or score > table[-1]["score"])
+
+    def submit(self, mode, score, seed=None, autoscroll=False, name=None): # RETURNS THE 1-BASED RANK, OR None IF IT DIDN'T MAKE THE TABLE
+        rank = self.insert(mode, score, seed, autoscroll, name)
+        if rank is not None:
+            self.save()
+        return rank
+
+    def submit_replay(self, mode, replay, done): # RE-SIMULATE ON THE WRITER THREAD, THEN SUBMIT - done(RANK OR None) IS CALLED FROM THERE
+        self.checks.append((mode, replay, done))
+        self.wake()
+
+    def keep_replay(self, replay, path): # PACKING AND COMPRESSING A LONG RUN TAKES TENS OF MS - DONE ON THE WRITER THREAD TOO
+        self.replays.append((replay, path))
+        self.wake()
+
+    def insert(self, mode, score, seed=None, autoscroll=False, name=None):
+        if not self.qualifies(mode, score):
+            return None
+        entry = {"score": score, "name": name or getpass.getuser(), "date": datetime.date.today().isoformat(), "seed": seed, "autoscroll": autoscroll}
+        with self.lock:
+            table = self.tables.setdefault(mode, [])
+            rank = next((i for i, e in enumerate(table) if score > e["score"]), len(table))
+            table.insert(rank, entry)
+            del table[self.top_n:]
+        return rank + 1
+
+    def save(self): # WRITE-BEHIND - WAKE THE WRITER THREAD AND RETURN STRAIGHT AWAY
+        self.changed = True
+        self.wake()
+
+    def wake(self):
+        self.idle.clear()
+        self.dirty.set()
+        if self.writer is None:
+            self.writer = threading.Thread(target=self.write_loop, name="highscores", daemon=True)
+            self.writer.start()
+
+    def write_loop(self): # ERRORS ARE PRINTED AND THE LOOP CARRIES ON - A DEAD WRITER WOULD LOSE EVERY LATER SCORE
+        while True:
+            self.dirty.wait()
+            self.dirty.clear()
+            try:
+                while self.replays:
+                    self.store(*self.replays.popleft())
+                while self.checks: # A LONG RUN TAKES SECONDS TO RE-SIMULATE - HERE, NOT AT DEATH ON THE MAIN THREAD
+                    self.check(*self.checks.popleft())
+                if self.changed:
+                    self.changed = False
+                    self.write()
+            finally:
+                if not self.dirty.is_set():
+                    self.idle.set()
+
+    def check(self, mode, replay, done):
+        rank = None
+        try:
+            if verify_replay(replay)[0]:
+                rank = self.insert(mode, replay["score"], replay["seed"], replay["autoscroll"])
+                self.changed = self.changed or rank is not None
+        except Exception:
+            traceback.print_exc()
+        try:
+            done(rank) # EVEN AFTER AN ERROR, SO NOTHING WAITS ON IT FOREVER
+        except Exception:
+            traceback.print_exc()
+
+    def store(self, replay, path):
+        try:
+            save_replay(replay, path)
+        except Exception:
+            traceback.print_exc()
+
+    def write(self):
+        try:
+            with self.lock:
+                data = json.dumps(self.tables, indent=1)
+            temp = self.path + ".tmp"
+            with open(temp, "w") as f: # TEMP FILE THEN RENAME - A CRASH MID-WRITE LEAVES THE OLD FILE INTACT
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp, self.path)
+        except Exception: # A FULL OR READ-ONLY DISK - THE TABLES STAY IN MEMORY AND THE NEXT save TRIES AGAIN
+            self.changed = True
+            traceback.print_exc()
+
+    def flush(self, timeout=5): # WAIT FOR PENDING CHECKS AND WRITES (CALLED AT EXIT)
+        self.idle.wait(timeout)
+
+
+HIGHSCORES = HighscoreStore()
+atexit.register(HIGHSCORES.flush)
+
+
+# REPLAY FILE: HEADER, THEN THE PER-TICK INPUTS PACKED TWO TICKS PER BYTE AND ZLIB COMPRESSED
+REPLAY_MAGIC = b"THR3" # THR1 CAME FROM THE OLD INLINE GENERATOR, THR2 FROM END-OF-TICK COLLISION - NEITHER RE-SIMULATES NOW
+REPLAY_HEADER = struct.Struct("<4sBIQIQ") # MAGIC, FLAGS, SEED, HIGHSCORE AT START, TICKS, FINAL SCORE
+REPLAY_MULTIPLAYER = 1
+REPLAY_AUTOSCROLL = 2
+
+def replay_of(sim): # WHAT load_replay WOULD READ BACK, COPIED OUT OF A RUN SO THE Simulation CAN MOVE ON
+    return {"mode": sim.mode, "autoscroll": sim.autoscroll, "seed": sim.seed, "highscore": sim.highscore,
+            "ticks": sim.ticks, "score": sim.score, "inputs": bytes(sim.inputs)}
+
+def save_replay(replay, path):
+    flags = (REPLAY_MULTIPLAYER if replay["mode"] == "multiplayer" else 0) | (REPLAY_AUTOSCROLL if replay["autoscroll"] else 0)
+    inputs = replay["inputs"] + bytes(len(replay["inputs"]) % 2)
+    packed = bytes(a | b << 4 for a, b in zip(inputs[0::2], inputs[1::2]))
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(REPLAY_HEADER.pack(REPLAY_MAGIC, flags, replay["seed"], replay["highscore"], replay["ticks"], replay["score"]))
+        f.write(zlib.compress(packed, 9))
+
+def load_replay(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, flags, seed, highscore, ticks, score = REPLAY_HEADER.unpack_from(data)
+    if magic != REPLAY_MAGIC:
+        raise ValueError(f"{path} is not a Train Hop replay" if magic[:3] != REPLAY_MAGIC[:3] else f"{path} was recorded by an older version")
+    packed = zlib.decompress(data[REPLAY_HEADER.size:])
+    inputs = bytearray()
+    for byte in packed:
+        inputs.append(byte & 15)
+        inputs.append(byte >> 4)
+    return {"mode": "multiplayer" if flags & REPLAY_MULTIPLAYER else "singleplayer", "autoscroll": bool(flags & REPLAY_AUTOSCROLL),
+            "seed": seed, "highscore": highscore, "ticks": ticks, "score": score, "inputs": inputs[:ticks]}
+
+def verify_replay(replay): # RE-SIMULATE HEADLESS, TRUE IF IT ENDS WITH THE RECORDED SCORE AFTER THE RECORDED TICKS
+    sim = Simulation(replay["mode"], replay["autoscroll"], replay["highscore"], replay["seed"])
+    for bits in replay["inputs"]:
+        if sim.step(bits & 3, bits >> 2):
+            break
+    return sim.ticks == replay["ticks"] and sim.score == replay["score"] and sim.game_over, sim
+
+
+# SNAPSHOT: EVERYTHING A Simulation NEEDS TO CARRY ON FROM A TICK EXACTLY AS IT WOULD HAVE - FLOATS ARE KEPT AS DOUBLES
+SNAPSHOT_HEADER = struct.Struct("<IqddIBqqBHHHH") # TICKS, SCORE, CAMERAY, PREV CAMERAY, SPAWNED, GAME OVER, LEVEL TOP, LEVEL SCORE, COUNTS
+SNAPSHOT_RNG = struct.Struct("<625I?d") # random.Random STATE - MT WORDS AND POSITION, GAUSS_NEXT
+SNAPSHOT_PLAYER = struct.Struct("<dddddddBB") # X, Y, PREV X, PREV Y, JUMP, GRAVITY, XMOVEMENT, DIRECTION, STILL IN THE TEAM
+SNAPSHOT_PLATFORM = struct.Struct("<dddBBd") # X, Y, PREV X, KIND, STATE, SPEED
+SNAPSHOT_SPRING = struct.Struct("<ddB")
+SNAPSHOT_SPIKE = struct.Struct("<dd")
+PENDING_SPRING = 1 # FLAGS AFTER EACH PREFETCHED PLATFORM
+PENDING_SPIKE = 2
+
+SNAPSHOT_EVERY = 6 # TICKS BETWEEN REWIND SNAPSHOTS
+REWIND_SECONDS = 10
+REWIND_BYTES = 2 * 1024 * 1024 # HARD CAP ON THE COMPRESSED REWIND HISTORY
+
+
+class RewindBuffer: # RECENT SNAPSHOTS, ZLIB COMPRESSED - EACH DELTA USES ITS GROUP'S KEYFRAME AS THE PRESET DICTIONARY
+    KEYFRAME_EVERY = 20 # SNAPSHOTS PER GROUP
+
+    def __init__(self, window=REWIND_SECONDS * FPS, cap=REWIND_BYTES):
+        self.window = window # TICKS OF HISTORY TO KEEP
+        self.cap = cap
+        self.clear()
+
+    def clear(self):
+        self.groups = deque() # (KEYFRAME TICK, KEYFRAME DATA, DEQUE OF (TICK, DELTA DATA)), OLDEST FIRST
+        self.key_raw = None # UNCOMPRESSED NEWEST KEYFRAME - THE DICTIONARY FOR THE NEXT DELTAS
+        self.since_key = 0
+        self.stored = 0
+
+    @property
+    def bytes(self):
+        return self.stored + (len(self.key_raw) if self.key_raw else 0)
+
+    def push(self, tick, raw):
+        if self.key_raw is None or self.since_key >= self.KEYFRAME_EVERY:
+            data = zlib.compress(raw, 1)
+            self.groups.append((tick, data, deque()))
+            self.key_raw = raw
+            self.since_key = 0
+        else:
+            packer = zlib.compressobj(1, zdict=self.key_raw)
+            data = packer.compress(raw) + packer.flush()
+            self.groups[-1][2].append((tick, data))
+            self.since_key += 1
+        self.stored += len(data)
+
+        while len(self.groups) > 1 and self.groups[1][0] <= tick - self.window: # A WHOLE GROUP OLDER THAN THE WINDOW
+            self.drop_group()
+        while self.bytes > self.cap: # HARD CAP - DELTAS ONLY NEED THEIR KEYFRAME, SO THE OLDEST CAN GO ONE AT A TIME
+            if len(self.groups) > 1:
+                self.drop_group()
+            elif self.groups[0][2]:
+                self.stored -= len(self.groups[0][2].popleft()[1])
+            else:
+                break
+
+    def drop_group(self, newest=False):
+        _, data, deltas = self.groups.pop() if newest else self.groups.popleft()
+        self.stored -= len(data) + sum(len(delta) for _, delta in deltas)
+
+    def seek(self, tick): # (TICK, SNAPSHOT) OF THE OLDEST ENTRY AT OR AFTER tick, THE NEWEST IF NONE ARE, None WHEN EMPTY
+        found = None
+        for key_tick, key_data, deltas in self.groups:
+            for entry_tick, data in [(key_tick, None), *deltas]:
+                found = (key_data, entry_tick, data)
+                if entry_tick >= tick:
+                    return self.unpack(*found)
+        return self.unpack(*found) if found else None
+
+    def unpack(self, key_data, tick, data):
+        key_raw = zlib.decompress(key_data)
+        return tick, key_raw if data is None else zlib.decompressobj(zdict=key_raw).decompress(data)
+
+    def truncate(self, tick): # FORGET EVERYTHING AFTER tick - THAT FUTURE WAS REWOUND AWAY
+        while self.groups and self.groups[-1][0] > tick:
+            self.drop_group(newest=True)
+        if self.groups:
+            deltas = self.groups[-1][2]
+            while deltas and deltas[-1][0] > tick:
+                self.stored -= len(deltas.pop()[1])
+        self.key_raw = None # NEXT PUSH STARTS A FRESH GROUP
+        self.since_key = 0
+
+
+INPUT_LEFT = 1
+INPUT_RIGHT = 2
+
+PLAYER_WIDTH = 100
+PLAYER_HEIGHT = 50
+PLATFORM_WIDTH = 96
+PLATFORM_HEIGHT = 32
+CHUNK_PLATFORMS = 8 # PLATFORMS PER LevelGenerator CHUNK
+PREFETCH_CHUNKS = 3 # CHUNKS QUEUED AHEAD OF THE CAMERA
+SPRING_SIZE = 32
+SPIKE_SIZE = 50
+ENTITY_CAP = 64 # MOST SPIKES/SPRINGS KEPT ALIVE - FAR MORE THAN FIT IN ONE SCREEN
 
 
 class Player:
-    def __init__(self, x, y, left_img, right_img):
-        self.x = x
-        self.y = y
+    __slots__ = ("x", "y", "prev_x", "prev_y", "jump", "gravity", "xmovement", "direction", "sweep", "kind", "playing")
+
+    def __init__(self, x, y, kind="human"):
+        self.x = self.prev_x = x # PREV_* IS WHERE THE LAST TICK STARTED, FOR RENDER INTERPOLATION
+        self.y = self.prev_y = y
         self.jump = 0
         self.gravity = 0
         self.xmovement = 0
         self.direction = 0
-        self.left_img = left_img
-        self.right_img = right_img
+        self.sweep = pygame.Rect(x, y, PLAYER_WIDTH, PLAYER_HEIGHT) # SCRATCH FOR swept_hits - EVERYTHING ONE TICK MOVED THROUGH
+        self.kind = kind # "human" OR "bot"
+        self.playing = True # STILL IN Simulation.team - A FLAG, SO THE PER-TICK LOOPS DON'T SEARCH THE LIST
 
-    def update(self, keys, left_keys, right_keys):
+    def update(self, inputs): # INPUTS IS A BITFIELD OF INPUT_LEFT / INPUT_RIGHT
+        self.prev_x = self.x
+        self.prev_y = self.y
         if not self.jump:
             self.y += self.gravity
             self.gravity += GRAVITY_STEP
@@ -42,17 +365,14 @@ class Player:
             self.y -= self.jump
             self.jump -= GRAVITY_STEP
 
-        for i in left_keys:
-            if keys[i]:
-                self.xmovement = max(self.xmovement - 1, -10)
-                self.direction = 1
+        if inputs & INPUT_LEFT:
+            self.xmovement = max(self.xmovement - 1, -10)
+            self.direction = 1
 
-        for i in right_keys:
-            if keys[i]:
-                self.xmovement = min(self.xmovement + 1, 10)
-                self.direction = 0
-        else:
-            self.xmovement *= 0.9 # INTERTIA!
+        if inputs & INPUT_RIGHT:
+            self.xmovement = min(self.xmovement + 1, 10)
+            self.direction = 0
+        self.xmovement *= 0.9 # INTERTIA!
 
         self.x += self.xmovement
 
@@ -61,30 +381,1293 @@ class Player:
         elif self.x < -50:
             self.x = SCREEN_WIDTH
 
-    def draw(self, screen, cameray):
-        img = self.right_img if self.direction == 0 else self.left_img
-        screen.blit(img, (self.x, self.y - cameray))
+    def swept_hits(self, index): # (SERIAL, ENTITY) FROM A YIndex FOR EVERYTHING THE RECT PASSED THROUGH OVER THE LAST TICK, IN DEQUE ORDER
+        y0 = int(self.prev_y)
+        y1 = int(self.y)
+        if y0 <= y1:
+            top, bottom = y0, y1 + PLAYER_HEIGHT
+        else:
+            top, bottom = y1, y0 + PLAYER_HEIGHT
+        low, high = index.span(top, bottom)
+        if low == high:
+            return NO_HITS
+        x1 = int(self.x)
+        x0 = int(self.prev_x) if abs(self.x - self.prev_x) < SCREEN_WIDTH // 2 else x1 # WRAPPING PAST THE EDGE IS A JUMP, NOT A SWEEP
+        box = self.sweep
+        box.update(min(x0, x1), top, abs(x1 - x0) + PLAYER_WIDTH, bottom - top) # CHEAP FIRST CUT
+        items = index.items
+        found = NO_HITS
+        for i in range(low, high):
+            rect = items[i].rect
+            if box.colliderect(rect) and swept_hit(x0, y0, x1, y1, rect):
+                if found is NO_HITS:
+                    found = []
+                found.append((index.serials[i], items[i]))
+        if len(found) > 1:
+            found.sort(key=lambda entry: entry[0])
+        return found
+
+
+def swept_hit(x0, y0, x1, y1, rect): # DOES A PLAYER RECT MOVING FROM (x0, y0) TO (x1, y1) OVERLAP rect AT ANY POINT ON THE WAY
+    enter, leave = 0, 1 # SEGMENT AGAINST rect GROWN BY THE PLAYER'S SIZE - AT THE END POINT THIS IS EXACTLY colliderect
+    for start, end, low, high in ((x0, x1, rect.left - PLAYER_WIDTH, rect.right), (y0, y1, rect.top - PLAYER_HEIGHT, rect.bottom)):
+        if start == end:
+            if not low < start < high:
+                return False
+            continue
+        a = (low - start) / (end - start)
+        b = (high - start) / (end - start)
+        if a > b:
+            a, b = b, a
+        enter = max(enter, a)
+        leave = min(leave, b)
+        if enter >= leave:
+            return False
+    return True
+
+
+NO_HITS = () # swept_hits WHEN NOTHING WAS TOUCHED - SHARED, SO A QUIET TICK ALLOCATES NOTHING
+
+
+class YIndex: # ENTITIES SORTED BY RECT TOP, SO A TICK ONLY LOOKS AT THE BAND A PLAYER SWEPT THROUGH - NOTHING HERE EVER MOVES VERTICALLY
+    def __init__(self, height, entities=()):
+        self.height = height # TALLEST RECT, SO ONE STARTING ABOVE A BAND BUT REACHING INTO IT IS STILL FOUND
+        self.tops = [] # SORTED RECT TOPS, WITH serials AND items IN STEP
+        self.serials = [] # GO UP IN INSERTION ORDER, WHICH IS THE ORDER OF THE ENTITY'S DEQUE
+        self.items = []
+        self.serial = 0
+        for entity in entities:
+            self.add(entity)
+
+    def add(self, entity):
+        i = bisect.bisect(self.tops, entity.rect.top)
+        self.tops.insert(i, entity.rect.top)
+        self.serials.insert(i, self.serial)
+        self.items.insert(i, entity)
+        self.serial += 1
+
+    def remove(self, entity):
+        i = bisect.bisect_left(self.tops, entity.rect.top)
+        while self.items[i] is not entity:
+            i += 1
+        del self.tops[i]
+        del self.serials[i]
+        del self.items[i]
+
+    def span(self, top, bottom): # items[low:high] ARE EVERY RECT THAT COULD OVERLAP top..bottom - READ IN PLACE, NOTHING IS COPIED
+        low = bisect.bisect_left(self.tops, top - self.height)
+        return low, bisect.bisect_left(self.tops, bottom, low)
+
+
+class Platform:
+    __slots__ = ("x", "y", "prev_x", "kind", "state", "speed", "rect")
+
+    def __init__(self, x, y, kind, state=0, speed=0):
+        self.x = self.prev_x = x
+        self.y = y
+        self.kind = kind # 0 GREEN, 1 BLUE, 2 RED
+        self.state = state # RED: BREAK STAGE 0-3, BLUE: 1 MOVING RIGHT
+        self.speed = speed
+        self.rect = pygame.Rect(x, y, PLATFORM_WIDTH - 10, PLATFORM_HEIGHT)
+
+
+class Spike:
+    __slots__ = ("x", "y", "rect")
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+        self.rect = pygame.Rect(x + (SPIKE_SIZE / 4), y, SPIKE_SIZE * 0.25, SPIKE_SIZE * 0.25) # ONLY THE TIP KILLS
+
+
+class Spring:
+    __slots__ = ("x", "y", "state", "rect")
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+        self.state = 0 # 1 ONCE BOUNCED ON
+        self.rect = pygame.Rect(x, y, SPRING_SIZE, SPRING_SIZE)
+
+
+class LevelGenerator: # THE ENDLESS LEVEL AS CHUNKS OF (PLATFORM, SPRING OR None, SPIKE OR None), LOWEST FIRST - NO DISPLAY NEEDED
+    def __init__(self, seed, score=0):
+        self.rng = random.Random(f"{seed}:level") # OWN STREAM, SO A CHUNK DEPENDS ONLY ON THE SEED AND THE SCORES IT WAS MADE AT
+        self.score = score # PICKS THE TIER OF THE NEXT CHUNK
+        self.top = SCREEN_HEIGHT + 100 # Y OF THE HIGHEST PLATFORM MADE SO FAR
+
+    def __iter__(self):
+        return self
+
+    def opening(self): # PLATFORM GENERATION AT START - SIMPLE AND EASY GUIDE
+        rng = self.rng
+        chunk = []
+        on = SCREEN_HEIGHT+100
+        while on > -500:
+            x = rng.randint(0, SCREEN_WIDTH-100)
+            platform = rng.choices([0, 1, 2], weights=[75, 50, 25])[0]
+            speed = rng.uniform(4, 7.5) if platform == 1 else 0
+            chunk.append((Platform(x, on, platform, 0, speed), None, None))
+            self.top = on
+            on -= 50
+        return chunk
+
+    def __next__(self): # CREATION OF NEW PLATFORMS, SPIKES AND SPRINGS
+        rng = self.rng
+        chunk = []
+        for _ in range(CHUNK_PLATFORMS):
+            platform = rng.choices([0, 1, 2], weights=[65, 50, 35])[0]
+
+            if self.score < 30000: # SPIKE AND DIST, GRADUALLY INCREASE DIFFICULTY
+                spawnSpike = rng.randint(1, 10) == 1
+                dist = self.score // 250 + 50
+            elif self.score < 100000: # DIFFERENT RULE AT 30000 to 100000
+                spawnSpike = rng.randint(1, 5) == 1
+                dist = self.score // 750 + 30
+            else: # DIFFERENT RULE PAST 100000
+                spawnSpike = rng.randint(1, 3) == 1
+                dist = self.score // 1000 + 30
+
+            speed = rng.uniform(3, 7) if platform == 1 else 0 # RULE FOR SPEED OF BLUE PLATFORM
+            self.top -= dist
+            coords = Platform(rng.randint(0, SCREEN_WIDTH-100), self.top, platform, 0, speed)
+
+            spring = spike = None
+            if rng.randint(0, 1000) > 900 and platform == 0: # ADD SPRING CHANCE
+                spring = Spring(coords.x + rng.randint(0, 50), coords.y - 25)
+            if spawnSpike and (coords.kind != 1): # ADD SPIKE
+                spike = Spike(coords.x + rng.randint(0, 50), coords.y - 50)
+            chunk.append((coords, spring, spike))
+        return chunk
+
+
+BOOSTS = { # EVENT: (JUMP, CAMERA LIFT) FOR A PLAYER ON THEIR OWN, (JUMP, CAMERA LIFT) FOR EVERY TEAM MEMBER IN MULTIPLAYER
+    "boing": ((45, 90), (40, 50)), # SPRING
+    "success": ((50, 60), (40, 50)), # RED PLATFORM AT STAGE 2
+    "newhighscore": ((50, 20), (50, 20)), # HIGH SCORE LINE - ALWAYS THE WHOLE TEAM
+}
+
+
+class Simulation: # GAME RULES ONLY - NO SURFACES, NO MIXER, NO CLOCK
+    def __init__(self, mode="multiplayer", autoscroll=False, highscore=0, seed=None, roster=None):
+        self.mode = mode
+        self.autoscroll = autoscroll
+        self.highscore = highscore
+        self.roster = roster or (["human"] if mode == "singleplayer" else ["human", "human"]) # ONE KIND PER PLAYER
+        self.profiler = None # OPTIONAL FrameProfiler, TIMES EACH PHASE OF step()
+        self.hits = [] # SCRATCH FOR updatePlatforms, CLEARED EACH TICK
+        self.reset(seed)
+
+    def reset(self, seed=None): # A NEW RUN - SAME SEED, MODE, AUTOSCROLL, HIGHSCORE AND INPUTS ALWAYS GIVE THE SAME RUN
+        self.seed = random.getrandbits(32) if seed is None else seed
+        self.rng = random.Random(self.seed)
+        self.inputs = bytearray() # ONE BYTE PER TICK: P1 BITS | P2 BITS << 2
+        self.score = 0
+        self.cameray = self.prev_cameray = 0
+        self.ticks = 0
+        self.platforms = deque([Platform(SCREEN_WIDTH//2-50, SCREEN_HEIGHT-300, 0), Platform(SCREEN_WIDTH//2-50 if self.mode != 'multiplayer' else SCREEN_WIDTH//2+50, SCREEN_HEIGHT-300, 0)])
+        self.springs = deque(maxlen=ENTITY_CAP) # OLDEST (LOWEST) ON THE LEFT
+        self.spikes = deque(maxlen=ENTITY_CAP)
+        self.events = [] # SOUND/TEXT CUES FROM THE LAST STEP, FOR THE RENDERER
+        self.game_over = False
+        self.players = [Player(SCREEN_WIDTH//2-50 if i % 2 == 0 or self.mode == "singleplayer" else SCREEN_WIDTH//2+50, SCREEN_HEIGHT-400, kind)
+                        for i, kind in enumerate(self.roster)]
+        self.player1 = self.players[0]
+        self.team = list(self.players) # STILL IN THE RUN - BOTS THAT FALL ARE DROPPED
+        self.level = LevelGenerator(self.seed)
+        self.pending = deque() # PREFETCHED (PLATFORM, SPRING, SPIKE) WAITING TO SCROLL INTO VIEW
+        self.spawned = 0 # PLATFORMS SCROLLED AWAY SO FAR - platforms[i] IS THE (spawned + i)TH PLATFORM OF THE RUN
+        self.assisted = False # REWOUND, QUICKLOADED OR ON AUTOPILOT
+        self.generatePlatforms()
+        self.reindex()
+
+    def reindex(self): # REBUILD THE COLLISION INDEXES AFTER platforms, springs OR spikes WERE REPLACED WHOLESALE
+        self.platform_index = YIndex(PLATFORM_HEIGHT, self.platforms)
+        self.spring_index = YIndex(SPRING_SIZE, self.springs)
+        self.spike_index = YIndex(SPIKE_SIZE, self.spikes)
+
+    @property
+    def recordable(self): # REPLAYS HOLD AT MOST TWO HUMANS, AND NO BOTS OR REWINDS
+        return "bot" not in self.roster and self.roster.count("human") <= 2 and not self.assisted
+
+    def step(self, *inputs): # ADVANCE ONE TICK WITH ONE INPUT PER HUMAN, RETURNS TRUE ONCE THE RUN IS OVER
+        if self.game_over:
+            return True
+        self.events.clear()
+        self.ticks += 1
+        self.inputs.append((inputs[0] if inputs else 0) | (inputs[1] << 2 if len(inputs) > 1 else 0))
+        humans = iter(inputs)
+        inputs = [next(humans, 0) if p.kind == "human" else self.steer(p) for p in self.players]
+        self.prev_cameray = self.cameray
+
+        if self.autoscroll: self.cameray -= self.score // 10000 * 0.25 + 0.75  # AUTOSCROLLING
+
+        self.checkHighscore()
+        self.prefetch()
+        self.spawnPlatforms()
+        self.cullEntities()
+        self.lap("generation")
+        self.updatePlayers(inputs)
+        self.lap("updatePlayers")
+        self.updatePlatforms()
+        self.lap("updatePlatforms")
+        self.checkPlayers()
+        self.lap("collisions")
+        return self.game_over
+
+    def lap(self, phase):
+        if self.profiler is not None:
+            self.profiler.lap(phase)
+
+    def steer(self, player): # BOT INPUT - HEAD FOR THE CLOSEST PLATFORM ABOVE ITS FEET
+        target = None
+        for p in self.platforms:
+            if p.y < player.y + PLAYER_HEIGHT - 20 and (p.kind != 2 or p.state < 2) and (target is None or p.y > target.y):
+                target = p
+        if target is None:
+            return 0
+        dx = target.x + (PLATFORM_WIDTH - 10) / 2 - (player.x + PLAYER_WIDTH / 2)
+        return INPUT_RIGHT if dx > 10 else INPUT_LEFT if dx < -10 else 0
+
+    def boost(self, player, event): # GROUP RULES FOR SPRINGS, RED BOOSTS AND THE HIGH SCORE LINE
+        solo, team = BOOSTS[event]
+        group = self.team if self.mode == "multiplayer" or event == "newhighscore" else [player]
+        jump, lift = team if self.mode == "multiplayer" else solo
+        if event == "boing" and self.mode != "multiplayer" and player.jump >= 20: # STILL RISING FAST OFF THE LAST SPRING
+            jump = 50
+        for p in group:
+            p.gravity = 0
+            p.jump = jump
+        self.cameray -= lift
+
+    def checkHighscore(self): # HIGH SCORE LINE BOOST
+        highscore_y = (self.highscore)
+        for player in [self.player1]:
+            if -1.1 * highscore_y <= player.y <= -0.9 * highscore_y:
+                self.events.append("newhighscore")
+                self.boost(player, "newhighscore")
+
+    def prefetch(self): # TOP UP THE QUEUE AHEAD OF THE CAMERA, AT MOST ONE CHUNK PER TICK
+        if len(self.pending) <= (PREFETCH_CHUNKS - 1) * CHUNK_PLATFORMS:
+            self.level.score = self.score
+            self.pending.extend(next(self.level))
+
+    def spawnPlatforms(self): # MOVE PREFETCHED PLATFORMS, SPIKES AND SPRINGS INTO THE WORLD AS THE CAMERA CLIMBS
+        for _ in range(len(self.platforms)):
+            if self.platforms[1].y - self.cameray <= (SCREEN_HEIGHT):
+                break
+            if not self.pending: # CAMERA OUTRAN THE QUEUE
+                self.prefetch()
+            platform, spring, spike = self.pending.popleft()
+            self.platforms.append(platform) # ADD TO LIST
+            self.platform_index.add(platform)
+            if spring:
+                self.add_entity(self.springs, self.spring_index, spring)
+            if spike:
+                self.add_entity(self.spikes, self.spike_index, spike)
+            self.platform_index.remove(self.platforms.popleft())
+            self.spawned += 1
+
+    def add_entity(self, entities, index, entity): # APPEND TO A CAPPED DEQUE, KEEPING ITS INDEX IN STEP
+        if len(entities) == entities.maxlen:
+            index.remove(entities[0])
+        entities.append(entity)
+        index.add(entity)
+
+    def cullEntities(self): # DESPAWN SPIKES AND SPRINGS BELOW THE CAMERA - THE CAMERA NEVER SCROLLS BACK DOWN
+        for entities, index in ((self.spikes, self.spike_index), (self.springs, self.spring_index)):
+            while entities and entities[0].y - self.cameray > SCREEN_HEIGHT:
+                index.remove(entities.popleft())
+
+    def entity_counts(self):
+        return {"platforms": len(self.platforms), "spikes": len(self.spikes), "springs": len(self.springs)}
+
+    def snapshot(self): # THE WHOLE RUN AT THIS TICK AS BYTES, FOR restore() - INPUTS ARE NOT INCLUDED, THEY ONLY GROW
+        level = self.level
+        parts = [SNAPSHOT_HEADER.pack(self.ticks, self.score, self.cameray, self.prev_cameray, self.spawned, self.game_over,
+                                      level.top, level.score, len(self.players), len(self.platforms), len(self.springs),
+                                      len(self.spikes), len(self.pending))]
+        for rng in (self.rng, level.rng):
+            _, words, gauss = rng.getstate()
+            parts.append(SNAPSHOT_RNG.pack(*words, gauss is not None, gauss or 0.0))
+        parts += [SNAPSHOT_PLAYER.pack(p.x, p.y, p.prev_x, p.prev_y, p.jump, p.gravity, p.xmovement, p.direction, p.playing)
+                  for p in self.players]
+        parts += [SNAPSHOT_PLATFORM.pack(p.x, p.y, p.prev_x, p.kind, p.state, p.speed) for p in self.platforms]
+        parts += [SNAPSHOT_SPRING.pack(s.x, s.y, s.state) for s in self.springs]
+        parts += [SNAPSHOT_SPIKE.pack(s.x, s.y) for s in self.spikes]
+        for p, spring, spike in self.pending:
+            parts.append(SNAPSHOT_PLATFORM.pack(p.x, p.y, p.prev_x, p.kind, p.state, p.speed) +
+                         bytes([(PENDING_SPRING if spring else 0) | (PENDING_SPIKE if spike else 0)]))
+            if spring:
+                parts.append(SNAPSHOT_SPRING.pack(spring.x, spring.y, spring.state))
+            if spike:
+                parts.append(SNAPSHOT_SPIKE.pack(spike.x, spike.y))
+        return b"".join(parts)
+
+    def restore(self, data): # BACK TO A snapshot() OF THIS RUN - RECORDED INPUTS PAST ITS TICK ARE DROPPED
+        (self.ticks, self.score, self.cameray, self.prev_cameray, self.spawned, game_over, top, level_score,
+         player_count, platform_count, spring_count, spike_count, pending_count) = SNAPSHOT_HEADER.unpack_from(data)
+        self.game_over = bool(game_over)
+        self.level.top = top
+        self.level.score = level_score
+        offset = SNAPSHOT_HEADER.size
+        for rng in (self.rng, self.level.rng):
+            state = SNAPSHOT_RNG.unpack_from(data, offset)
+            rng.setstate((3, state[:625], state[626] if state[625] else None))
+            offset += SNAPSHOT_RNG.size
+
+        team = []
+        for player in self.players[:player_count]:
+            (player.x, player.y, player.prev_x, player.prev_y, player.jump, player.gravity, player.xmovement,
+             player.direction, in_team) = SNAPSHOT_PLAYER.unpack_from(data, offset)
+            offset += SNAPSHOT_PLAYER.size
+            player.playing = bool(in_team)
+            if in_team:
+                team.append(player)
+        self.team = team
+
+        def platform():
+            nonlocal offset
+            x, y, prev_x, kind, state, speed = SNAPSHOT_PLATFORM.unpack_from(data, offset)
+            offset += SNAPSHOT_PLATFORM.size
+            p = Platform(x, y, kind, state, speed)
+            p.prev_x = prev_x
+            return p
+
+        def spring():
+            nonlocal offset
+            x, y, state = SNAPSHOT_SPRING.unpack_from(data, offset)
+            offset += SNAPSHOT_SPRING.size
+            s = Spring(x, y)
+            s.state = state
+            return s
+
+        def spike():
+            nonlocal offset
+            x, y = SNAPSHOT_SPIKE.unpack_from(data, offset)
+            offset += SNAPSHOT_SPIKE.size
+            return Spike(x, y)
+
+        self.platforms.clear()
+        self.platforms.extend(platform() for _ in range(platform_count))
+        self.springs.clear()
+        self.springs.extend(spring() for _ in range(spring_count))
+        self.spikes.clear()
+        self.spikes.extend(spike() for _ in range(spike_count))
+        self.pending.clear()
+        for _ in range(pending_count):
+            p = platform()
+            flags = data[offset]
+            offset += 1
+            self.pending.append((p, spring() if flags & PENDING_SPRING else None, spike() if flags & PENDING_SPIKE else None))
+
+        self.reindex()
+        del self.inputs[self.ticks:]
+        self.events.clear()
+        self.assisted = True
+
+    def generatePlatforms(self): # OPENING SECTION, STRAIGHT INTO THE WORLD
+        self.platforms.extend(platform for platform, _, _ in self.level.opening())
+
+    def updatePlayers(self, inputs): # PLAYER MOVEMENT - ONE INPUT PER ROSTER SLOT
+        for player, bits in zip(self.players, inputs):
+            if player.playing:
+                player.update(bits)
+
+        for player in self.team: # CAMERA MOVEMENT
+            if player.y - self.cameray <= -100:
+                self.cameray -= 45
+            if player.y - self.cameray <= 100:
+                self.cameray -= 35
+            elif player.y - self.cameray <= 300:
+                self.cameray -= 15
+
+    def updatePlatforms(self): # PLAYER AND PLATFORM COLLISION, PLATFORM MOVEMENT
+        hits = self.hits # (PLATFORM SERIAL, PLAYER INDEX, PLATFORM) - ONLY PLATFORMS IN THE BAND EACH FALLING PLAYER SWEPT THROUGH
+        hits.clear()
+        for i, player in enumerate(self.players):
+            if player.gravity and player.playing: # ONLY FALLING PLAYERS LAND
+                for serial, p in player.swept_hits(self.platform_index):
+                    hits.append((serial, i, p))
+        if len(hits) > 1:
+            hits.sort(key=lambda hit: hit[:2]) # SAME ORDER AS CHECKING PLATFORM BY PLATFORM
+
+        for _, i, p in hits:
+            player = self.players[i]
+            if player.gravity and player.y < (p.y - self.cameray): # PLAYER COLLISION WITH PLATFORM
+                if p.kind != 2: # JUMP IF NOT RED
+                    player.jump = 15
+                    player.gravity = 0
+                    self.events.append("jump")
+                else: # RED PLATFORM
+                    if p.state == 0 or p.state == 1: # IF STAGE 0 OR 1, JUMP AND RANDOMLY INCREASE STATE/DISAPPEAR
+                        player.jump = 15
+                        player.gravity = 0
+                        self.events.append("jump")
+                        if self.rng.random() > 0.1:
+                            p.state += 1
+                            self.events.append("break")
+                        if p.state == 1 and self.rng.random() < 0.3:
+                            p.state = 3
+                            self.events.append("break")
+
+                    elif p.state == 2: # IF STAGE 2, CHANCE FOR JUMP, DISAPPEAR, BIG BOOST
+                        if self.rng.random() < 0.3:
+                            player.jump = 15
+                            player.gravity = 0
+                            self.events.append("jump")
+                            p.state += 1
+                        elif self.rng.random() < 0.1:
+                            p.state = 0
+                        else:
+                            self.events.append("success")
+                            self.boost(player, "success")
+                            p.state += 1
 
-    def get_rect(self):
-        return pygame.Rect(self.x, self.y, 100, 50)
+        for p in self.platforms:
+            if p.kind == 1: # BLUE PLATFORM MOVEMENT, BASED ON SPEED
+                speed = p.speed
+                p.prev_x = p.x
+                if p.state == 1:
+                    p.x += speed
+                    if p.x > SCREEN_WIDTH - 100:
+                        p.state = 0
+                else:
+                    p.x -= speed
+                    if p.x <= 0:
+                        p.state = 1
+                p.rect.x = int(p.x)
+
+    def checkPlayers(self): # UPDATE SCORE - SPIKE AND SPRING - CHECK FOR GAME OVER
+        team = self.team
+        i = 0
+        while i < len(team): # BY INDEX, SO A BOT CAN DROP OUT MID-LOOP WITHOUT COPYING THE TEAM EVERY TICK
+            player = team[i]
+            if -1 * player.y > self.score:
+                self.score = -1 * int(player.y)
+            if (player.y - self.cameray) > SCREEN_HEIGHT or (player.jump <= 0 and player.swept_hits(self.spike_index)): # FELL OR SPIKED
+                if player.kind == "bot": # BOTS DROP OUT, HUMANS END THE RUN
+                    del team[i]
+                    player.playing = False
+                    continue
+                self.game_over = True
+                self.events.append("death")
+                return
+
+            for _, spring in player.swept_hits(self.spring_index): # SPRING BOOST BASED ON MODE
+                spring.state = 1
+                self.boost(player, "boing")
+                self.events.append("boing")
+            i += 1
+
+
+class Ghost: # THE BEST RUN REPLAYED IN ITS OWN Simulation, WITH ITS OWN SEED, HIGH SCORE AND BOOSTS - ONLY ITS POSITIONS ARE SHOWN
+    def __init__(self, replay):
+        self.sim = Simulation(replay["mode"], replay["autoscroll"], replay["highscore"], replay["seed"])
+        self.inputs = replay["inputs"]
+        self.trail = array("d") # X, Y, DIRECTION OF EACH PLAYER AFTER EVERY TICK PLAYED SO FAR - A REWIND JUST LOOKS BACK
+        self.record()
+
+    def record(self):
+        for p in self.sim.players:
+            self.trail.extend((p.x, p.y, p.direction))
+
+    def advance(self, tick): # PLAY THE REPLAY ON TO tick, OR TO ITS END
+        sim = self.sim
+        while sim.ticks < tick and sim.ticks < len(self.inputs) and not sim.game_over:
+            bits = self.inputs[sim.ticks]
+            sim.step(bits & 3, bits >> 2)
+            self.record()
+
+    def at(self, tick): # [(X, Y, DIRECTION)] PER PLAYER AFTER tick - EMPTY ONCE THE REPLAY HAS ENDED
+        self.advance(tick)
+        count = len(self.sim.players)
+        start = tick * count * 3
+        if tick < 0 or start >= len(self.trail):
+            return []
+        return [tuple(self.trail[start + i * 3:start + i * 3 + 3]) for i in range(count)]
+
+
+class Autopilot: # DRIVES ONE HUMAN SLOT BY PLAYING OUT SHORT FUTURES OF THE REAL PHYSICS - READS THE Simulation, NEVER CHANGES IT
+    LEAD = 10 # TICKS OF THE CURRENT PLAN COMMITTED AHEAD OF EACH SEARCH, SO A SEARCH CAN SPREAD OVER SEVERAL FRAMES
+    HORIZON = 90 # LONGEST FUTURE A CANDIDATE IS PLAYED OUT FOR - IT STOPS EARLIER AT ITS FIRST LANDING
+    HOLDS = (4, 8, 16, 32) # TICKS A CANDIDATE HOLDS ITS FIRST INPUT BEFORE SWITCHING TO ITS SECOND
+    CHECK_TICKS = 4 # A FUTURE LOOKS AT THE CLOCK THIS OFTEN, AND PAUSES UNTIL THE NEXT FRAME ONCE THE BUDGET IS SPENT
+    RED_RISK = 60 # A RED PLATFORM MIGHT BREAK, SO LANDING ON ONE COUNTS AS THIS MANY PX LOWER
+    TEAM_MARGIN = 150 # IN MULTIPLAYER, EACH PX A FUTURE SCROLLS THE CAMERA PAST THIS CLOSE TO LOSING A TEAMMATE COUNTS AS 2 PX LOWER
+
+    def __init__(self, sim, slot):
+        self.sim = sim
+        self.slot = slot # WHICH HUMAN INPUT IT REPLACES
+        self.player = [p for p in sim.players if p.kind == "human"][slot]
+        self.body = Player(0, 0) # SCRATCH PLAYER THE FUTURES ARE PLAYED ON
+        self.blue = pygame.Rect(0, 0, 0, 0) # SCRATCH RECT FOR A BLUE PLATFORM WHERE IT WILL BE
+        self.plan = deque() # (BITS, x, y AFTER THE TICK) FOR THE COMING TICKS
+        self.expected = None # WHERE THE LAST PLANNED TICK SHOULD HAVE LEFT THE PLAYER
+        self.search = None
+        self.stats = {"searches": 0, "futures": 0, "cut_short": 0, "surprises": 0, "fallback_ticks": 0}
+
+    def next_input(self): # BITS FOR THE NEXT sim.step - THE PLAN IF THE WORLD DID WHAT IT PREDICTED, THE BOTS' RULE OTHERWISE
+        sim, player = self.sim, self.player
+        if self.expected is not None and self.expected != (sim.ticks, player.x, player.y): # A RED BREAK, A TEAM BOOST, A REWIND...
+            self.stats["surprises"] += 1
+            self.plan.clear()
+            self.search = None
+        search = self.search
+        if search is not None and sim.ticks < search["from"]: # REWOUND PAST WHERE IT STARTED
+            self.search = search = None
+        if search is not None and sim.ticks >= search["root"]: # OUT OF TIME - THE BEST FUTURE SO FAR TAKES OVER
+            self.stats["cut_short"] += 1
+            self.adopt()
+        if not self.plan:
+            self.expected = None
+            self.stats["fallback_ticks"] += 1
+            return sim.steer(player)
+        bits, x, y = self.plan.popleft()
+        self.expected = (sim.ticks + 1, x, y)
+        return bits
+
+    def think(self, budget): # SEARCH FOR budget SECONDS - A FUTURE STILL BEING PLAYED WHEN IT RUNS OUT CARRIES ON NEXT FRAME
+        deadline = time.perf_counter() + budget
+        if self.sim.game_over:
+            return
+        if self.search is None:
+            self.begin()
+        search = self.search
+        if search is None:
+            return
+        while search["future"] is not None or search["queue"]:
+            if search["future"] is None:
+                bits, tail = search["queue"].pop()
+                search["future"] = self.play(search["state"], bits, tail, search["world"], self.LEAD, True)
+            try:
+                while True:
+                    next(search["future"])
+                    if time.perf_counter() > deadline:
+                        return
+            except StopIteration as done:
+                score, trace, end = done.value
+            search["future"] = None
+            if search["planned"] is not None: # THAT WAS THE LEAD
+                self.lead(trace, end)
+                if self.search is None:
+                    return
+                continue
+            self.stats["futures"] += 1
+            if search["best"] is None or score > search["best"][0]:
+                search["best"] = (score, trace)
+        self.adopt()
+
+    def begin(self): # START A SEARCH BY PLAYING OUT THE NEXT LEAD TICKS OF THE PLAN - A FUTURE LIKE ANY OTHER, SO IT KEEPS TO THE BUDGET
+        sim, player = self.sim, self.player
+        state = (player.x, player.y, player.prev_x, player.prev_y, player.jump, player.gravity, player.xmovement,
+                 player.direction, sim.cameray, sim.score, frozenset())
+        planned = list(self.plan)
+        last = planned[-1][0] if planned else 0
+        world = self.world()
+        lead = self.play(state, [bits for bits, _, _ in planned[:self.LEAD]], last, world, 0, False, self.LEAD)
+        self.search = {"from": sim.ticks, "root": sim.ticks + self.LEAD, "state": None, "world": world, "queue": [],
+                       "future": lead, "best": None, "planned": planned}
+
+    def lead(self, trace, state): # THE LEAD IS PLAYED OUT - COMMIT IT AND QUEUE THE FUTURES THAT START AFTER IT
+        search = self.search
+        planned, search["planned"] = search["planned"], None
+        done = self.sim.ticks - search["from"] # TICKS ALREADY TAKEN FROM THE PLAN WHILE THE LEAD WAS PLAYED OUT
+        if done > len(planned): # THE PLAN RAN OUT AND THE PLAYER WAS STEERED, SO IT ISN'T WHERE THE LEAD STARTED
+            self.search = None
+            return
+        self.plan = deque(trace[done:])
+        if not done:
+            self.expected = None # THE PLAN WAS JUST REBUILT FROM WHERE THE PLAYER REALLY IS
+        if state is None: # NO WAY OUT WITHIN LEAD TICKS
+            self.search = None
+            return
+        rest = [bits for bits, _, _ in planned[self.LEAD:]]
+        queue = [(rest, rest[-1])] if rest else [] # THE PLAN SO FAR, PLAYED OUT FIRST
+        queue += [([], bits) for bits in (0, INPUT_LEFT, INPUT_RIGHT)]
+        queue += [([first] * hold, second) for hold in self.HOLDS for first in (0, INPUT_LEFT, INPUT_RIGHT)
+                  for second in (0, INPUT_LEFT, INPUT_RIGHT) if first != second]
+        queue.reverse() # POPPED FROM THE END
+        search["state"] = state
+        search["queue"] = queue
+        self.stats["searches"] += 1
+
+    def adopt(self): # SWAP THE PLAN PAST THE SEARCH'S ROOT FOR ITS BEST FUTURE, THEN START AFRESH NEXT TIME
+        search, self.search = self.search, None
+        keep = search["root"] - self.sim.ticks
+        if search["best"] is None or len(self.plan) < keep: # NOTHING WAS PLAYED OUT, OR THE PLAN IT BUILDS ON IS GONE
+            return
+        while len(self.plan) > keep:
+            self.plan.pop()
+        self.plan.extend(search["best"][1])
+
+    def world(self): # EVERY BLUE PLATFORM AS [x, STATE, SPEED, LEFT EDGE PER TICK] - ROWS ARE FILLED IN ONLY AS FAR AS A FUTURE LOOKS
+        return {p: [p.x, p.state, p.speed, [p.rect.x]] for p in self.sim.platforms if p.kind == 1}
+
+    @staticmethod
+    def blue_left(lane, tick): # LEFT EDGE tick TICKS FROM THE SEARCH'S START, MOVED AS Simulation.updatePlatforms MOVES IT
+        row = lane[3]
+        while len(row) <= tick:
+            if lane[1] == 1:
+                lane[0] += lane[2]
+                if lane[0] > SCREEN_WIDTH - 100:
+                    lane[1] = 0
+            else:
+                lane[0] -= lane[2]
+                if lane[0] <= 0:
+                    lane[1] = 1
+            row.append(int(lane[0]))
+        return row[tick]
+
+    def play(self, state, bits, tail, lefts, offset, stop, ticks=HORIZON): # ONE FUTURE AS A GENERATOR: bits, THEN tail HELD - SAME ORDER AS Simulation.step
+        sim, body = self.sim, self.body
+        (body.x, body.y, body.prev_x, body.prev_y, body.jump, body.gravity, body.xmovement,
+         body.direction, cameray, score, used) = state
+        multiplayer = sim.mode == "multiplayer"
+        solo, team = BOOSTS["boing"]
+        spring_jump, lift = team if multiplayer else solo
+        platform_index, spring_index, spike_index = sim.platform_index, sim.spring_index, sim.spike_index
+        items, serials = platform_index.items, platform_index.serials
+        floor = max([p.y + self.TEAM_MARGIN - SCREEN_HEIGHT for p in sim.team if p.kind == "human" and p is not self.player], default=None)
+        trace = []
+        for tick in range(ticks):
+            if sim.autoscroll:
+                cameray -= score // 10000 * 0.25 + 0.75
+            b = bits[tick] if tick < len(bits) else tail
+            body.update(b)
+            if body.y - cameray <= -100:
+                cameray -= 45
+            if body.y - cameray <= 100:
+                cameray -= 35
+            elif body.y - cameray <= 300:
+                cameray -= 15
+
+            landed = None
+            if body.gravity:
+                y0 = int(body.prev_y)
+                y1 = int(body.y)
+                if y0 <= y1:
+                    low, high = platform_index.span(y0, y1 + PLAYER_HEIGHT)
+                else:
+                    low, high = platform_index.span(y1, y0 + PLAYER_HEIGHT)
+                if low < high:
+                    x1 = int(body.x)
+                    x0 = int(body.prev_x) if abs(body.x - body.prev_x) < SCREEN_WIDTH // 2 else x1
+                    first = None # SERIAL OF THE LANDING SO FAR - Simulation LANDS ON THE EARLIEST IN DEQUE ORDER
+                    for i in range(low, high):
+                        p = items[i]
+                        if p.kind == 2 and (p.state >= 2 or p in used): # MIGHT NOT BOUNCE - NEVER COUNTED ON
+                            continue
+                        if first is not None and serials[i] > first:
+                            continue
+                        rect = p.rect
+                        lane = lefts.get(p)
+                        if lane is not None:
+                            rect = self.blue
+                            rect.update(self.blue_left(lane, offset + tick), p.rect.y, p.rect.w, p.rect.h)
+                        if swept_hit(x0, y0, x1, y1, rect) and body.y < p.y - cameray:
+                            landed, first = p, serials[i]
+                    if landed is not None:
+                        body.jump = 15
+                        body.gravity = 0
+                        if landed.kind == 2:
+                            used = used | {landed}
+
+            if -body.y > score:
+                score = -int(body.y)
+            trace.append((b, body.x, body.y))
+            if tick % self.CHECK_TICKS == 0:
+                yield
+            if body.y - cameray > SCREEN_HEIGHT or (body.jump <= 0 and body.swept_hits(spike_index)):
+                return (0, tick), trace, None # DEAD - LATER IS LESS BAD
+            if body.swept_hits(spring_index):
+                jump = 50 if not multiplayer and body.jump >= 20 else spring_jump
+                body.gravity = 0
+                body.jump = jump
+                cameray -= lift
+            if stop and landed is not None and tick:
+                break
+        climb = -body.y - (self.RED_RISK if landed is not None and landed.kind == 2 else 0)
+        if floor is not None and floor > cameray: # LEAVES A TEAMMATE NEAR THE BOTTOM EDGE
+            climb -= 2 * (floor - cameray)
+        return (1, climb), trace, (body.x, body.y, body.prev_x, body.prev_y, body.jump, body.gravity, body.xmovement,
+                             body.direction, cameray, score, used)
+
+
+def asset_cache_path(scale):
+    return os.path.join(ASSET_CACHE_DIR, f"assets@{scale:g}.bin")
+
+
+class AssetRegistry: # ONE SHARED CACHE OF IMAGES, SCALED/FLIPPED SPRITES, FONTS AND SOUNDS FOR EVERY SCREEN AND GAME
+    FONT_BYTES = 64 * 1024 # ROUGH COST OF A FONT, SURFACES AND SOUNDS ARE MEASURED
+
+    def __init__(self, budget=96 * 1024 * 1024):
+        self.budget = budget
+        self.entries = OrderedDict() # KEY -> (ASSET, BYTES), LEAST RECENTLY USED FIRST
+        self.used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.music_path = None
+        self.mapped = None # memoryview OF THE BAKED CACHE FILE, SEE bake()
+        self.base = 0 # WHERE ITS BLOBS START
+        self.baked = {} # KEY -> INDEX ENTRY, ONLY THOSE STILL MATCHING THEIR SOURCE FILES, THE CODE AND THE MIXER
+        self.packed = set() # SOURCE FILES A FRESH BAKED ATLAS ALREADY HOLDS, SCALED - NOT WORTH DECODING
+        self.stale = 0
+        self.jobs = deque() # KEYS FOR THE LOADER THREAD, IN THE ORDER THEY ARE NEEDED
+        self.pending = set() # QUEUED OR LOADING, NOT IN entries YET
+        self.ready = deque() # (KEY, ASSET OR None) HANDED BACK BY THE LOADER
+        self.arrived = threading.Condition() # GUARDS jobs, ready AND loading
+        self.loading = False
+        self.load_ms = 0 # LOADER THREAD TIME SINCE THE LAST preload
+
+    def get(self, key, build): # RETURN THE CACHED ASSET FOR KEY, BUILDING IT ON FIRST USE
+        if self.ready or key in self.pending:
+            self.collect(key)
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key][0]
+        self.misses += 1
+        return self.add(key, build())
+
+    def add(self, key, asset):
+        size = self.sizeof(asset)
+        self.entries[key] = (asset, size)
+        self.used += size
+        self.evict()
+        return asset
+
+    def sizeof(self, asset):
+        if isinstance(asset, pygame.Surface):
+            return asset.get_width() * asset.get_height() * asset.get_bytesize()
+        if isinstance(asset, SpriteAtlas):
+            return self.sizeof(asset.surface)
+        if isinstance(asset, pygame.mixer.Sound):
+            freq, fmt, channels = pygame.mixer.get_init()
+            return int(asset.get_length() * freq * channels * abs(fmt) // 8)
+        return self.FONT_BYTES
+
+    def evict(self): # DROP LEAST RECENTLY USED ASSETS UNTIL WE ARE BACK UNDER BUDGET (NEVER THE NEWEST ONE)
+        while self.used > self.budget and len(self.entries) > 1:
+            key, (asset, size) = self.entries.popitem(last=False)
+            self.used -= size
+            self.evictions += 1
+
+    def image(self, path, size=None, flip=False, alpha=True): # KEYED BY PATH AND TRANSFORM
+        if size is None and not flip:
+            key = ("image", path, alpha)
+            return self.get(key, lambda: self.decode(key))
+
+        def transform():
+            img = self.image(path, alpha=alpha)
+            if size is not None:
+                img = pygame.transform.scale(img, size)
+            if flip:
+                img = pygame.transform.flip(img, True, False)
+            return img
+        return self.get(("image", path, alpha, size, flip), transform)
+
+    def decode(self, key): # AN IMAGE OR SOUND FROM ITS SOURCE FILE - SAFE ON THE LOADER THREAD
+        if key[0] == "sound":
+            return pygame.mixer.Sound(key[1])
+        img = pygame.image.load(key[1])
+        if pygame.display.get_surface() is None: # NO DISPLAY YET, CONVERT LATER
+            return img
+        return img.convert_alpha() if key[2] else img.convert()
+
+    def font(self, name, size):
+        return self.get(("font", name, size), lambda: pygame.font.SysFont(name, size))
+
+    def sound(self, path, volume=None):
+        key = ("sound", path)
+        sound = self.get(key, lambda: self.decode(key))
+        if volume is not None:
+            sound.set_volume(volume)
+        return sound
+
+    def mapped_sound(self, path): # A BAKED CLIP TOO BIG TO KEEP DECODED - COPIED OUT OF THE FILE WHEN PLAYED, None IF IT ISN'T BAKED
+        return self.unbake(("sound", path)) if ("sound", path) in self.baked else None
+
+    def music(self, path): # MUSIC IS STREAMED BY THE MIXER, ONLY RELOAD IT WHEN THE TRACK CHANGES
+        if self.music_path != path:
+            pygame.mixer.music.load(path)
+            self.music_path = path
+
+    def preload(self, *paths, alpha=True): # LOAD AHEAD OF TIME ON THE LOADER THREAD SO THE FIRST FRAME DOES NOT PAY FOR IT
+        self.queue([("sound", path) if path.endswith(".wav") else ("image", path, alpha) for path in paths if path not in self.packed])
+
+    def preload_baked(self): # EVERYTHING ELSE THE CACHE HOLDS, LIKE THE ATLAS, BUT NOT CLIPS TOO BIG TO KEEP DECODED
+        self.queue([key for key, entry in self.baked.items() if not entry.get("lazy")])
+
+    def queue(self, keys):
+        keys = [key for key in dict.fromkeys(keys) if key not in self.entries and key not in self.pending]
+        self.pending.update(keys)
+        with self.arrived:
+            self.jobs.extend(keys)
+            if self.loading or not self.jobs:
+                return
+            self.loading = True
+            self.load_ms = 0
+        threading.Thread(target=self.load, daemon=True).start()
+
+    def load(self): # LOADER THREAD - BAKED ENTRIES ARE COPIED STRAIGHT OUT OF THE MAPPED FILE, ANYTHING ELSE IS DECODED FROM SOURCE
+        while True:
+            with self.arrived:
+                if not self.jobs:
+                    self.loading = False
+                    return
+                key = self.jobs.popleft()
+            start = time.perf_counter()
+            try:
+                if key in self.baked:
+                    asset = self.unbake(key)
+                else:
+                    asset = self.decode(key)
+                    release_heap(0) # THE PNG/WAV DECODER'S BUFFERS - A BAKED ENTRY HAS NONE
+            except Exception: # ANYTHING THAT FAILS IS LEFT FOR THE MAIN THREAD TO BUILD, WHERE THE ERROR SHOWS
+                asset = None
+            with self.arrived:
+                self.load_ms += (time.perf_counter() - start) * 1000
+                self.ready.append((key, asset))
+                self.arrived.notify_all()
+
+    def collect(self, key=None): # MOVE WHAT THE LOADER FINISHED INTO THE CACHE, WAITING FOR key IF IT IS STILL ON ITS WAY
+        while True:
+            with self.arrived:
+                if not self.ready and key in self.pending:
+                    self.arrived.wait()
+                done, self.ready = self.ready, deque()
+            for done_key, asset in done:
+                self.pending.discard(done_key)
+                if asset is not None and done_key not in self.entries:
+                    self.add(done_key, asset)
+            if key not in self.pending:
+                return
+
+    def finish(self): # BLOCK UNTIL EVERYTHING QUEUED IS IN THE CACHE
+        while self.pending:
+            self.collect(next(iter(self.pending)))
+
+    @staticmethod
+    def code(): # ANYTHING THAT CHANGES HOW A BAKED ENTRY IS BUILT CHANGES THIS
+        parts = [inspect.getsource(SpriteAtlas.__init__), inspect.getsource(SpriteAtlas.from_cache), inspect.getsource(TrainHop.build_atlas),
+                 inspect.getsource(TrainHop.build_ghost), inspect.getsource(AssetRegistry.image), inspect.getsource(AssetRegistry.decode),
+                 repr(SpriteAtlas.WIDTH), pygame.version.ver] # METHODS, NOT WHOLE CLASSES - getsource PARSES THE MODULE FOR A CLASS
+        return format(zlib.crc32("\n".join(parts).encode()), "08x") # NOT hashlib - ITS OPENSSL COSTS 3 MB OF RSS FOR ONE CHECKSUM
+
+    @staticmethod
+    def stamp(path): # WHAT A SOURCE FILE LOOKED LIKE WHEN IT WAS BAKED
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return [path, st.st_size, st.st_mtime_ns]
+
+    def load_cache(self, path): # MAP A FILE WRITTEN BY bake() - ENTRIES ARE READ FROM IT BY THE LOADER THREAD, NOT HERE
+        self.baked = {}
+        self.packed = set()
+        self.stale = 0
+        try:
+            with open(path, "rb") as f:
+                mapped = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+            magic, length = ASSET_CACHE_HEADER.unpack_from(mapped)
+            if magic != ASSET_CACHE_MAGIC:
+                return
+            index = json.loads(bytes(mapped[ASSET_CACHE_HEADER.size:ASSET_CACHE_HEADER.size + length]))
+        except (OSError, ValueError, struct.error): # NOT BAKED YET, EMPTY OR CUT SHORT - EVERYTHING LOADS FROM SOURCE
+            return
+        if index["code"] != self.code():
+            self.stale = len(index["entries"])
+            return
+        base = ASSET_CACHE_HEADER.size + length
+        base += -base % ASSET_CACHE_ALIGN
+        mixer = list(pygame.mixer.get_init() or ())
+        stamps = {}
+        for entry in index["entries"]:
+            fresh = all(stamps.setdefault(source[0], self.stamp(source[0])) == source for source in entry["sources"])
+            fresh = fresh and base + entry["offset"] + entry["bytes"] <= len(mapped) # NOT CUT SHORT
+            if fresh and (entry["kind"] != "sound" or index["mixer"] == mixer):
+                self.baked[ast.literal_eval(entry["key"])] = entry
+                if entry["kind"] == "atlas":
+                    self.packed.update(source[0] for source in entry["sources"])
+            else:
+                self.stale += 1
+        self.mapped = mapped
+        self.base = base
+
+    def unbake(self, key):
+        entry = self.baked[key]
+        data = self.mapped[self.base + entry["offset"]:self.base + entry["offset"] + entry["bytes"]]
+        if entry["kind"] == "sound":
+            return pygame.mixer.Sound(buffer=data) # SAMPLES ARE ALREADY IN THE MIXER'S FORMAT AND RATE
+        img = pygame.image.frombuffer(data, tuple(entry["size"]), "BGRA")
+        if pygame.display.get_surface() is None:
+            img = img.copy() # frombuffer SHARES THE MAPPED PAGES
+        else:
+            img = img.convert_alpha() if entry["alpha"] else img.convert()
+        return SpriteAtlas.from_cache(img, entry["places"]) if entry["kind"] == "atlas" else img
+
+    def bake(self, path, streamed=()): # WRITE EVERY LOADED IMAGE, ATLAS AND CLIP AS READY-TO-USE PIXELS AND SAMPLES, RETURNS (ENTRIES, FILE BYTES)
+        self.finish()
+        entries, blobs, offset = [], [], 0
+        sprites = [path for path in GAME_ASSETS if path.endswith(".png")]
+        packed = set(sprites) if any(key[0] == "atlas" for key in self.entries) else set()
+        for key, (asset, size) in self.entries.items():
+            if key[0] == "image" and key[1] in packed: # ONLY EVER READ TO BUILD THE ATLAS, WHICH IS BAKED ALREADY SCALED
+                continue
+            if key[0] == "sound":
+                data = asset.get_raw()
+                entry = {"kind": "sound", "sources": [self.stamp(key[1])], "lazy": key[1] in streamed} # AudioManager.streamed
+            elif key[0] in ("image", "atlas"): # FONTS COME FROM SDL_ttf AND LAYERS ARE DRAWN, NEITHER IS WORTH BAKING
+                surface = asset.surface if key[0] == "atlas" else asset
+                data = pygame.image.tobytes(surface, "BGRA")
+                entry = {"kind": key[0], "size": surface.get_size(), "alpha": bool(surface.get_flags() & pygame.SRCALPHA)}
+                if key[0] == "atlas":
+                    entry["places"] = {name: tuple(rect) for name, rect in asset.places.items()}
+                    entry["sources"] = [self.stamp(source) for source in sprites]
+                else:
+                    entry["sources"] = [self.stamp(key[1])]
+            else:
+                continue
+            entry.update(key=repr(key), offset=offset, bytes=len(data))
+            entries.append(entry)
+            blobs.append(data)
+            offset += len(data) + -len(data) % ASSET_CACHE_ALIGN
+
+        index = json.dumps({"code": self.code(), "mixer": pygame.mixer.get_init(), "entries": entries}).encode()
+        base = ASSET_CACHE_HEADER.size + len(index)
+        base += -base % ASSET_CACHE_ALIGN
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp = path + ".tmp"
+        with open(temp, "wb") as f:
+            f.write(ASSET_CACHE_HEADER.pack(ASSET_CACHE_MAGIC, len(index)) + index)
+            for entry, data in zip(entries, blobs):
+                f.seek(base + entry["offset"])
+                f.write(data)
+        os.replace(temp, path)
+        return len(entries), base + offset
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "entries": len(self.entries), "bytes": self.used,
+                "baked": len(self.baked), "stale": self.stale, "load_ms": round(self.load_ms, 1)}
+
+
+ASSETS = AssetRegistry()
+
+
+class TextCache: # RENDERED LABELS KEYED BY FONT, TEXT AND COLOR, LEAST RECENTLY USED DROPPED FIRST
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font, text, color):
+        key = (font, text, color)
+        surface = self.entries.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return surface
+        self.misses += 1
+        surface = self.entries[key] = font.render(text, True, color)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+        return surface
+
+    def number(self, font, label, value, color, pos): # LABEL THEN ONE CACHED GLYPH PER DIGIT, RETURNS [(SURFACE, (X, Y))] TO BLIT
+        x, y = pos
+        pieces = []
+        for part in [label, *str(value)]:
+            surface = self.render(font, part, color)
+            pieces.append((surface, (x, y)))
+            x += surface.get_width()
+        return pieces
+
+
+TEXT = TextCache()
+
+
+class AudioManager: # FIXED VOICE POOL WITH PRIORITIES, PER-EFFECT RATE LIMITS AND ONE TRIGGER PER EFFECT PER TICK
+    VOICES = 6
+    STREAM_BYTES = 256 * 1024 # BIGGER CLIPS ARE LOADED WHEN TRIGGERED AND DROPPED ONCE THEY FINISH, NOT KEPT DECODED
+    EFFECTS = { # NAME: (PATH, PRIORITY, MIN MS BETWEEN TRIGGERS)
+        "jump": ("assets/sfx/jump.wav", 0, 60),
+        "break": ("assets/sfx/break.wav", 1, 60),
+        "boing": ("assets/sfx/boing.wav", 1, 100),
+        "success": ("assets/sfx/success.wav", 2, 200),
+        "newhighscore": ("assets/sfx/newhighscore.wav", 2, 2500), # THE WHOLE CLIP, INSTEAD OF RESTARTING IT EVERY FRAME
+        "death": ("assets/sfx/death.wav", 3, 0),
+    }
+
+    def __init__(self, volume=SFX_VOLUME):
+        self.volume = volume
+        pygame.mixer.set_num_channels(self.VOICES)
+        self.voices = [pygame.mixer.Channel(i) for i in range(self.VOICES)]
+        self.playing = [None] * self.VOICES # (PRIORITY, SOUND) PER VOICE - HOLDS STREAMED CLIPS WHILE THEY PLAY
+        self.last_played = {}
+        self.this_tick = set()
+        self.dropped = 0
+        # NAME: EFFECTS ENTRY PLUS WHETHER IT IS STREAMED - SIZED ONCE HERE, NOT WITH A stat ON EVERY TRIGGER
+        self.effects = {name: (path, priority, interval, os.path.getsize(path) > self.STREAM_BYTES)
+                        for name, (path, priority, interval) in self.EFFECTS.items()}
+        self.streamed = {path for path, priority, interval, streamed in self.effects.values() if streamed}
+
+    def sound(self, name):
+        path, priority, interval, streamed = self.effects[name]
+        if streamed:
+            sound = ASSETS.mapped_sound(path) # A BAKED CLIP SKIPS THE DECODE AND RESAMPLE
+            if sound is None:
+                sound = pygame.mixer.Sound(path)
+            sound.set_volume(self.volume)
+            return sound
+        return ASSETS.sound(path, self.volume)
+
+    def preload(self): # QUEUED FOR THE LOADER THREAD - THE VOLUME IS SET WHEN EACH ONE IS FIRST PLAYED
+        ASSETS.preload(*[path for path, priority, interval, streamed in self.effects.values() if not streamed])
+
+    def begin_tick(self): # DUPLICATE TRIGGERS ARE MERGED WITHIN ONE TICK
+        self.this_tick.clear()
+        for i, voice in enumerate(self.voices):
+            if self.playing[i] and not voice.get_busy():
+                self.playing[i] = None
+
+    def play(self, name): # RETURNS THE CHANNEL, OR None IF THE TRIGGER WAS MERGED, RATE LIMITED OR OUTRANKED
+        path, priority, interval, streamed = self.effects[name]
+        now = pygame.time.get_ticks()
+        if name in self.this_tick or now - self.last_played.get(name, -interval) < interval:
+            self.dropped += 1
+            return None
+
+        free = [i for i, voice in enumerate(self.voices) if not voice.get_busy()]
+        if free:
+            slot = free[0]
+        else: # STEAL THE LOWEST PRIORITY VOICE, IF IT IS BELOW THIS ONE
+            slot = min(range(self.VOICES), key=lambda i: self.playing[i][0] if self.playing[i] else -1)
+            if self.playing[slot] and self.playing[slot][0] >= priority:
+                self.dropped += 1
+                return None
+
+        sound = self.sound(name)
+        self.voices[slot].play(sound)
+        self.playing[slot] = (priority, sound)
+        self.last_played[name] = now
+        self.this_tick.add(name)
+        return self.voices[slot]
+
+
+class FrameProfiler: # PER-PHASE FRAME TIMES, ROLLING p50/p99 AND AN OPTIONAL CSV/JSON LINES STREAM
+    PHASES = ["events", "wait", "autopilot", "generation", "updatePlayers", "updatePlatforms", "collisions", "ghost", "audio", "rewind", "queue", "text", "overlay", "blits", "present"]
+    COUNTS = ["platforms", "spikes", "springs"]
+    REFRESH = 30 # FRAMES BETWEEN OVERLAY UPDATES, SO THE OVERLAY TEXT ISN'T RE-RENDERED EVERY FRAME
+
+    def __init__(self, path=None, window=240):
+        self.times = {phase: deque(maxlen=window) for phase in self.PHASES + ["total"]}
+        self.current = {}
+        self.frame = 0
+        self.show = False
+        self.lines = []
+        self.last = self.start = time.perf_counter()
+        self.file = self.writer = None
+        if path:
+            self.file = open(path, "w", newline="", buffering=1) # LINE BUFFERED - SAMPLES SURVIVE A CRASH
+            if path.endswith(".csv"):
+                self.writer = csv.writer(self.file)
+                self.writer.writerow(["frame", "ticks"] + [f"{phase}_ms" for phase in self.PHASES] + ["total_ms"] + self.COUNTS)
+
+    def begin_frame(self):
+        self.current = {}
+        self.last = self.start = time.perf_counter()
+
+    def lap(self, phase): # TIME SINCE THE LAST LAP IS CHARGED TO PHASE
+        now = time.perf_counter()
+        self.current[phase] = self.current.get(phase, 0) + now - self.last
+        self.last = now
+
+    def end_frame(self, ticks, counts):
+        self.frame += 1
+        total = self.last - self.start
+        for phase in self.PHASES:
+            self.times[phase].append(self.current.get(phase, 0))
+        self.times["total"].append(total)
+
+        if self.file:
+            ms = [round(self.current.get(phase, 0) * 1000, 4) for phase in self.PHASES]
+            if self.writer:
+                self.writer.writerow([self.frame, ticks] + ms + [round(total * 1000, 4)] + [counts[name] for name in self.COUNTS])
+            else:
+                sample = {"frame": self.frame, "ticks": ticks, "ms": dict(zip(self.PHASES, ms)), "total_ms": round(total * 1000, 4)}
+                sample.update(counts)
+                self.file.write(json.dumps(sample) + "\n")
+
+        if self.show and (self.frame % self.REFRESH == 0 or not self.lines):
+            self.lines = [f"{'phase':<16}{'p50 ms':>8}{'p99 ms':>8}"]
+            for phase in self.PHASES + ["total"]:
+                p50, p99 = self.percentiles(phase)
+                self.lines.append(f"{phase:<16}{p50 * 1000:>8.2f}{p99 * 1000:>8.2f}")
+            self.lines.append("  ".join(f"{name} {counts[name]}" for name in self.COUNTS))
+
+    def percentiles(self, phase):
+        samples = sorted(self.times[phase])
+        if not samples:
+            return 0, 0
+        return samples[len(samples) // 2], samples[min(len(samples) - 1, len(samples) * 99 // 100)]
+
+    def toggle(self):
+        self.show = not self.show
+        self.lines = []
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+
+def present_ui(canvas): # MENUS ARE LAID OUT AT FULL SIZE - WHEN THE WINDOW RENDERS SMALLER, SHRINK THE CANVAS ONTO IT IN ONE BLIT
+    display = pygame.display.get_surface()
+    if canvas is not display:
+        pygame.transform.smoothscale(canvas, display.get_size(), display)
+    pygame.display.flip()
+
+
+def ui_pos(pos): # MOUSE POSITION IN FULL-SIZE MENU COORDINATES
+    width, height = pygame.display.get_surface().get_size()
+    return pos[0] * SCREEN_WIDTH // width, pos[1] * SCREEN_HEIGHT // height
+
+
+REDRAW_EVENTS = {VIDEOEXPOSE, WINDOWEXPOSED, WINDOWSIZECHANGED, WINDOWRESTORED} # THE WINDOW LOST WHAT WAS ON IT
+
+
+def run_screen(canvas, view, draw, handle, idle=None): # MENUS, PAUSE AND GAME OVER - SLEEP IN event.wait AND ONLY REDRAW WHEN view() CHANGES
+    shown = None
+    touched = time.perf_counter() # idle IS (SECONDS, RESULT) - RETURN RESULT ONCE NO EVENT HAS COME IN FOR THAT LONG
+    while True:
+        state = view()
+        if shown is None or state != shown[0]:
+            draw()
+            present_ui(canvas)
+            shown = (state,)
+        event = pygame.event.wait(IDLE_WAIT_MS)
+        if event.type == NOEVENT: # TIMED OUT
+            if idle and time.perf_counter() - touched >= idle[0]:
+                return idle[1]
+            continue
+        touched = time.perf_counter()
+        for event in [event] + pygame.event.get(): # ONE QUEUE, DRAINED ONCE PER WAKE-UP
+            if event.type == QUIT:
+                pygame.quit()
+                sys.exit()
+            if event.type in REDRAW_EVENTS:
+                shown = None
+            result = handle(event)
+            if result:
+                return result
+
+
+class SpriteAtlas: # EVERY GAME SPRITE SCALED ONCE AND PACKED INTO ONE DISPLAY-FORMAT SURFACE
+    WIDTH = 1024
+
+    def __init__(self, sprites, scale): # SPRITES IS {NAME: FULL-SIZE SURFACE}
+        scaled = {}
+        for name, img in sprites.items():
+            size = (max(1, round(img.get_width() * scale)), max(1, round(img.get_height() * scale)))
+            scaled[name] = img if size == img.get_size() else pygame.transform.smoothscale(img, size)
+
+        places = {} # SHELF PACKING, TALLEST FIRST
+        x = y = shelf = 0
+        for name in sorted(scaled, key=lambda n: -scaled[n].get_height()):
+            w, h = scaled[name].get_size()
+            if x + w > self.WIDTH:
+                x, y, shelf = 0, y + shelf, 0
+            places[name] = pygame.Rect(x, y, w, h)
+            x += w
+            shelf = max(shelf, h)
+
+        self.surface = pygame.Surface((self.WIDTH, y + shelf), pygame.SRCALPHA).convert_alpha()
+        self.surface.fill((0, 0, 0, 0))
+        self.places = places
+        self.frames = {}
+        for name, rect in places.items():
+            self.surface.blit(scaled[name], rect)
+            self.frames[name] = self.surface.subsurface(rect)
+
+    @classmethod
+    def from_cache(cls, surface, places): # AN ATLAS BAKED BY AssetRegistry.bake - ALREADY SCALED AND PACKED
+        atlas = cls.__new__(cls)
+        atlas.surface = surface
+        atlas.places = {name: pygame.Rect(rect) for name, rect in places.items()}
+        atlas.frames = {name: surface.subsurface(rect) for name, rect in atlas.places.items()}
+        return atlas
+
+    def __getitem__(self, name):
+        return self.frames[name]
+
+
+class DirtyRenderer: # REDRAWS ONLY WHAT CHANGED SINCE THE LAST FRAME, FULL FLIP WHEN THE CAMERA MOVES
+    MAX_DIRTY = 64 # PAST THIS MANY CHANGED RECTS A FULL REDRAW IS CHEAPER
+
+    def __init__(self, screen, background, scale=1):
+        self.screen = screen
+        self.background = background
+        self.scale = scale # SPRITE POSITIONS ARE IN GAME UNITS, THE SCREEN MAY BE SMALLER
+        self.previous = None
+        self.cameray = None
+
+    def invalidate(self): # NEXT FRAME IS A FULL REDRAW (AFTER THE PAUSE SCREEN ETC.)
+        self.previous = None
+
+    def present(self, sprites, cameray, profiler=None): # SPRITES IS A LIST OF (SURFACE, (X, Y)) IN DRAW ORDER
+        screen = self.screen
+        blits = getattr(screen, "fblits", None) or (lambda batch: screen.blits(batch, doreturn=False)) # fblits ON PYGAME-CE
+        scale = self.scale
+        sprites = [(surface, surface.get_rect(topleft=(int(pos[0] * scale), int(pos[1] * scale)))) for surface, pos in sprites]
+        dirty = None
+        if self.previous is not None and cameray == self.cameray:
+            before = {(id(surface), tuple(rect)) for surface, rect in self.previous}
+            after = {(id(surface), tuple(rect)) for surface, rect in sprites}
+            dirty = [rect for surface, rect in self.previous if (id(surface), tuple(rect)) not in after]
+            dirty += [rect for surface, rect in sprites if (id(surface), tuple(rect)) not in before]
+            dirty = [rect.clip(self.screen.get_rect()) for rect in dirty]
+            dirty = [rect for rect in dirty if rect.w and rect.h]
+
+        if dirty is None or len(dirty) > self.MAX_DIRTY: # FULL REDRAW - BACKGROUND, THEN EVERY SPRITE IN ONE CALL
+            screen.blit(self.background, (0, 0))
+            blits(sprites)
+            if profiler:
+                profiler.lap("blits")
+            pygame.display.flip()
+        elif dirty:
+            rects = [rect for surface, rect in sprites]
+            for area in dirty: # RESTORE THE BACKGROUND AND REDRAW EVERYTHING OVERLAPPING, CLIPPED TO THE AREA
+                screen.set_clip(area)
+                screen.blit(self.background, area, area)
+                blits([sprites[i] for i in area.collidelistall(rects)])
+            screen.set_clip(None)
+            if profiler:
+                profiler.lap("blits")
+            pygame.display.update(dirty)
+
+        self.previous = sprites
+        self.cameray = cameray
 
 
 class Menu:
     def __init__(self, screen):
         self.screen = screen
         self.autoscroll_enabled = False
-        self.font = pygame.font.SysFont(None, 40)
-        self.options_font = pygame.font.SysFont(None, 30)
+        self.font = ASSETS.font(None, 40)
+        self.options_font = ASSETS.font(None, 30)
         self.state = "info"
         self.selected = 0
         self.running = True 
         self.middle = SCREEN_WIDTH // 2 - 400
 
     def draw(self):
-        bg = pygame.image.load("assets/backgrounds/mainmenubg.png")
+        bg = ASSETS.image("assets/backgrounds/mainmenubg.png", alpha=False)
         self.screen.blit(bg, (0, 0))
-        titlefont = pygame.font.SysFont("freesansbold", 160)
-        label = titlefont.render("   RAIN    OP", True, (0, 0, 0))
+        titlefont = ASSETS.font("freesansbold", 160)
+        label = TEXT.render(titlefont, "   RAIN    OP", (0, 0, 0))
         self.screen.blit(label, (SCREEN_WIDTH // 2 - 290, SCREEN_HEIGHT // 2 + 50))
 
         if self.state == "main":
@@ -98,51 +1681,18 @@ class Menu:
         elif self.state == "leaderboard":
             pygame.display.set_caption("Train Hop - Leaderboard")
             self.draw_leaderboard()
-            for event in pygame.event.get():
-                if event.type == QUIT:
-                    pygame.quit()
-                    sys.exit()
-                elif event.type == KEYDOWN:
-                    if event.key == K_RETURN:
-                        self.state = "main"
-                        self.selected = 0
         
         elif self.state == "options":
             pygame.display.set_caption("Train Hop - Options")
             self.draw_options()
-
-            for event in pygame.event.get():
-                if event.type == QUIT:
-                    pygame.quit()
-                    sys.exit()
-                elif event.type == KEYDOWN:
-                    if event.key == K_UP:
-                        self.selected = (self.selected - 1) % 2 # TOGGLE SYSTEM
-                    elif event.key == K_DOWN:
-                        self.selected = (self.selected + 1) % 2
-
-                    elif event.key == K_RETURN:
-                        if self.selected == 0:
-                            self.autoscroll_enabled = not self.autoscroll_enabled
-                        elif self.selected == 1:
-                            self.state = "main"
-                            self.selected = 0
         
         elif self.state == "info":
             pygame.display.set_caption("Train Hop - Info")
             self.draw_info()
-            for event in pygame.event.get():
-                if event.type == QUIT:
-                    pygame.quit()
-                    sys.exit()
-                elif event.type == KEYDOWN:
-                    if event.key == K_RETURN:
-                        self.state = "main"
-                        self.selected = 0
 
 
     def draw_info(self):
-        title = self.font.render("Controls Info", True, (0, 0, 0))
+        title = TEXT.render(self.font, "Controls Info", (0, 0, 0))
         self.screen.blit(title, (self.middle - title.get_width() // 2, 0))
 
         controls = [
@@ -151,29 +1701,35 @@ class Menu:
             "Pause: P",
             "Retry on pause: R",
             "Back to menu on pause: M",
+            "Rewind 10 seconds: Backspace",
+            "Quicksave / Quickload: F5 / F9",
             "Menu: Up/Down arrows, Enter to select",
             "PRESS ENTER TO CONTINUE"
         ]
 
         for i, line in enumerate(controls):
-            rendered = self.options_font.render(line, True, (0, 0, 0))
+            rendered = TEXT.render(self.options_font, line, (0, 0, 0))
             self.screen.blit(rendered, (self.middle - rendered.get_width() // 2, 50 + i * 40))
 
-        back_text = self.font.render("Back", True, (0, 100, 200 if self.selected == 0 else 0))
-        self.screen.blit(back_text, (self.middle - back_text.get_width() // 2, 350))
+        back_text = TEXT.render(self.font, "Back", (0, 100, 200 if self.selected == 0 else 0))
+        self.screen.blit(back_text, (self.middle - back_text.get_width() // 2, 70 + len(controls) * 40))
 
-    def draw_leaderboard(self):
-        highscores = load_highscores()
-        title = self.font.render("Leaderboard", True, (0, 0, 0))
+    def draw_leaderboard(self): # TOP 5 PER MODE FROM THE IN-MEMORY TABLES - NO FILE READS
+        title = TEXT.render(self.font, "Leaderboard", (0, 0, 0))
         self.screen.blit(title, (self.middle - title.get_width() // 2, 0))
 
-        sp = self.options_font.render(f"Singleplayer: {highscores.get('singleplayer', 0)}", True, (0, 0, 0))
-        mp = self.options_font.render(f"Multiplayer: {highscores.get('multiplayer', 0)}", True, (0, 0, 0))
-        back = self.font.render("Back", True, (0, 100, 200 if self.selected == 0 else 0))
+        y = 70
+        for mode in HighscoreStore.MODES:
+            heading = TEXT.render(self.options_font, f"{mode.capitalize()}: {HIGHSCORES.best(mode)}", (0, 0, 0))
+            self.screen.blit(heading, (self.middle - heading.get_width() // 2, y))
+            for i, entry in enumerate(HIGHSCORES.table(mode)[:5]):
+                line = f"{i + 1}. {entry['name'] or '---'}  {entry['score']}  {entry['date']}{'  (autoscroll)' if entry['autoscroll'] else ''}"
+                rendered = TEXT.render(self.options_font, line, (60, 60, 60))
+                self.screen.blit(rendered, (self.middle - rendered.get_width() // 2, y + 35 + i * 30))
+            y += 210
 
-        self.screen.blit(sp, (self.middle - sp.get_width() // 2, 100))
-        self.screen.blit(mp, (self.middle - mp.get_width() // 2, 150))
-        self.screen.blit(back, (self.middle - back.get_width() // 2, 250))
+        back = TEXT.render(self.font, "Back", (0, 100, 200 if self.selected == 0 else 0))
+        self.screen.blit(back, (self.middle - back.get_width() // 2, y))
 
     def draw_options(self):
         autoscroll_text = f"AUTOSCROLL - {'ENABLED' if self.autoscroll_enabled else 'DISABLED'}"
@@ -182,30 +1738,49 @@ class Menu:
 
         for i, option in enumerate(options):
             color = (0, 100, 200) if i == self.selected else (0, 0, 0)
-            rendered = self.font.render(option, True, color)
+            rendered = TEXT.render(self.font, option, color)
             self.screen.blit(rendered, (self.middle - rendered.get_width() // 2, 200 + i * 60))
 
     def draw_menu(self, options):
         for i, option in enumerate(options):
             color = (0, 100, 200) if i == self.selected else (0, 0, 0)
-            label = self.font.render(option, True, color)
+            label = TEXT.render(self.font, option, color)
             self.screen.blit(label, (SCREEN_WIDTH // 3 - 200, 50 + i * 60))
 
-    def handle_input(self):
-        for event in pygame.event.get():
-            if event.type == QUIT:
-                pygame.quit()
-                sys.exit()
-            elif event.type == KEYDOWN:
-                if event.key == K_DOWN:
-                    self.selected += 1
-                elif event.key == K_UP:
-                    self.selected -= 1
-                elif event.key == K_RETURN:
-                    return self.select_option()
+    def handle_event(self, event): # ONE EVENT FOR WHICHEVER SCREEN IS UP, RETURNS THE MODE ONCE ONE IS PICKED
+        if event.type != KEYDOWN:
+            return None
+
+        if self.state in ("leaderboard", "info"):
+            if event.key == K_RETURN:
+                self.state = "main"
+                self.selected = 0
+
+        elif self.state == "options":
+            if event.key == K_UP:
+                self.selected = (self.selected - 1) % 2 # TOGGLE SYSTEM
+            elif event.key == K_DOWN:
+                self.selected = (self.selected + 1) % 2
+            elif event.key == K_RETURN:
+                if self.selected == 0:
+                    self.autoscroll_enabled = not self.autoscroll_enabled
+                elif self.selected == 1:
+                    self.state = "main"
+                    self.selected = 0
 
-        options_count = 5 if self.state == "main" else 3 # NUMBER OF OPTIONS
-        self.selected %= options_count
+        else:
+            if event.key == K_DOWN:
+                self.selected += 1
+            elif event.key == K_UP:
+                self.selected -= 1
+            elif event.key == K_RETURN:
+                return self.select_option()
+            options_count = 5 if self.state == "main" else 3 # NUMBER OF OPTIONS
+            self.selected %= options_count
+        return None
+
+    def view(self): # EVERYTHING THE MENU DRAWS FROM - IT IS ONLY REDRAWN WHEN THIS CHANGES
+        return self.state, self.selected, self.autoscroll_enabled
 
     def select_option(self):
         if self.state == "main":
@@ -239,34 +1814,52 @@ class Menu:
         return None
 
     def run(self):
-        clock = pygame.time.Clock()
-        while self.running:
-            self.draw()
-            result = self.handle_input()
-            if result:
-                return result
-            pygame.display.flip()
-            clock.tick(FPS)
+        return run_screen(self.screen, self.view, self.draw, self.handle_event, (ATTRACT_SECONDS, "demo"))
             
 class TrainHop:
-    def __init__(self, mode="multiplayer", autoscroll=False):
-        pygame.init()
+    CAN_REWIND = True # BACKSPACE REWINDS, F5/F9 QUICKSAVE AND QUICKLOAD
+
+    def __init__(self, mode="multiplayer", autoscroll=False, render_fps=FPS, profiler=None, session=None, demo=False):
+        self.session = session or GameSession(render_fps, profiler) # PYGAME, DISPLAY, MIXER AND ASSETS OUTLIVE THE GAME
+        self.screen = self.session.screen # FULL-SIZE CANVAS FOR THE PAUSE AND GAME OVER SCREENS
+        self.display = self.session.display # THE GAME ITSELF IS DRAWN STRAIGHT TO THE WINDOW, AT ITS SIZE
+        self.scale = self.session.scale
+        self.audio = self.session.audio
+        self.profiler = self.session.profiler # F3 SHOWS THE OVERLAY
+        self.render_fps = self.session.render_fps # 0 = AS FAST AS THE DISPLAY ALLOWS
+        self.clock = pygame.time.Clock()
+        self.alpha = 0 # HOW FAR BETWEEN THE LAST TWO TICKS THE CURRENT FRAME IS
+        self.view_y = 0 # INTERPOLATED CAMERA FOR THE CURRENT FRAME
+        self.font = ASSETS.font("Arial", round(25 * self.scale))
+        self.profiler_font = ASSETS.font("Courier New", max(8, round(16 * self.scale)))
+        self.load_assets()
+        self.renderer = DirtyRenderer(self.display, self.background, self.scale)
+        self.rewind = RewindBuffer()
+        self.quicksave = None # (SNAPSHOT, INPUTS SO FAR) OF THE CURRENT RUN
+        self.notice = None # (TEXT, TICK IT SHOWS UNTIL)
+        self.pending = None # REPLAY OF THE RUN THAT JUST ENDED, WHILE THE HIGHSCORE WRITER RE-SIMULATES IT
+        self.autopilots = []
+        self.sim = None
+        self.ghost = None
+        self.start(mode, autoscroll, demo)
+
+    def start(self, mode, autoscroll, demo=False): # NEW RUN - ONLY GAME STATE IS RESET, NOTHING IS RELOADED
+        self.mode = mode
         self.autoscroll = autoscroll
+        self.demo = demo # ATTRACT MODE - EVERY HUMAN ON AUTOPILOT, ANY KEY GOES BACK TO THE MENU
         self.paused = False
-        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption("Train Hop - " + mode.capitalize())  # Mode based window title
-        self.font = pygame.font.SysFont("Arial", 25)
-        self.mode = mode
-        self.load_assets()
-        self.setup_players()
+        if self.sim is None or self.sim.mode != mode or self.sim.autoscroll != autoscroll:
+            self.setup_players()
         self.reset_game_state()
+        self.renderer.invalidate()
 
     def draw_pause_screen(self):
+        backdrop = pygame.transform.scale(self.display, self.screen.get_size()) # THE GAME UNDER THE OVERLAY, KEPT FOR REDRAWS
         s = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))  
         s.set_alpha(128)  # Semi-transparent
         s.fill((0, 0, 0))  
-        self.screen.blit(s, (0, 0))  # cover the screen
-        button_font = pygame.font.SysFont("Arial", 30)
+        button_font = ASSETS.font("Arial", 30)
 
         # Button dimensions and positions
         button_width = 300
@@ -278,338 +1871,367 @@ class TrainHop:
         return_button = pygame.Rect(center_x - button_width // 2, center_y - button_height - spacing, button_width, button_height)
         menu_button = pygame.Rect(center_x - button_width // 2, center_y + spacing, button_width, button_height)
 
-        pygame.draw.rect(self.screen, (100, 200, 100), return_button)  # Green button
-        pygame.draw.rect(self.screen, (200, 100, 100), menu_button)  # Red button
-
-        return_text = button_font.render("Return to Game", True, (0, 0, 0))
-        menu_text = button_font.render("Back to Menu", True, (0, 0, 0))
-        self.screen.blit(return_text, (center_x - return_text.get_width() // 2, return_button.y + 15))
-        self.screen.blit(menu_text, (center_x - menu_text.get_width() // 2, menu_button.y + 15))
-
-        pygame.display.flip()  # Update the display
-
-        while self.paused: # HANDLE EVENTS
-            for event in pygame.event.get():
-                if event.type == QUIT:
-                    pygame.quit()
-                    sys.exit()
-                elif event.type == MOUSEBUTTONDOWN:
-                    if return_button.collidepoint(event.pos):
-                        pygame.mixer.music.unpause()
-                        self.paused = False  # Unpause the game
-                    elif menu_button.collidepoint(event.pos):
-                        pygame.mixer.music.rewind()
-                        self.paused = False
-                        return "menu"  # Return to menu
-                elif event.type == KEYDOWN:
-                    if event.key == K_ESCAPE or event.key == K_r:
-                        pygame.mixer.music.unpause()
-                        self.paused = False  # Unpause the game
-                    elif event.key == K_m:
-                        pygame.mixer.music.rewind()
-                        self.paused = False
-                        return "menu" # Return to menu
+        def draw():
+            self.screen.blit(backdrop, (0, 0))
+            self.screen.blit(s, (0, 0))  # cover the screen
+            pygame.draw.rect(self.screen, (100, 200, 100), return_button)  # Green button
+            pygame.draw.rect(self.screen, (200, 100, 100), menu_button)  # Red button
+
+            return_text = TEXT.render(button_font, "Return to Game", (0, 0, 0))
+            menu_text = TEXT.render(button_font, "Back to Menu", (0, 0, 0))
+            self.screen.blit(return_text, (center_x - return_text.get_width() // 2, return_button.y + 15))
+            self.screen.blit(menu_text, (center_x - menu_text.get_width() // 2, menu_button.y + 15))
+
+        def handle(event): # HANDLE EVENTS
+            if event.type == MOUSEBUTTONDOWN:
+                if return_button.collidepoint(ui_pos(event.pos)):
+                    return "resume"
+                elif menu_button.collidepoint(ui_pos(event.pos)):
+                    return "menu"
+            elif event.type == KEYDOWN:
+                if event.key == K_ESCAPE or event.key == K_r:
+                    return "resume"
+                elif event.key == K_m:
+                    return "menu"
+            return None
+
+        result = run_screen(self.screen, lambda: None, draw, handle) # NOTHING CHANGES WHILE PAUSED - DRAWN ONCE, THEN ASLEEP
+        self.paused = False
+        if result == "menu":
+            pygame.mixer.music.rewind()
+            return "menu"  # Return to menu
+        pygame.mixer.music.unpause()  # Unpause the game
+        return None
 
     def load_assets(self):
-        load = lambda f: pygame.transform.scale(pygame.image.load(f).convert_alpha(), (100, 50))
+        atlas = ASSETS.get(("atlas", self.scale), self.build_atlas)
 
         #  PLATFORMING IMAGES
-        self.green = pygame.image.load("assets/platforming/green.png").convert_alpha()
-        self.blue = pygame.image.load("assets/platforming/blue.png").convert_alpha()
-        self.red = pygame.image.load("assets/platforming/red.png").convert_alpha()
-        self.red_1 = pygame.image.load("assets/platforming/red_1.png").convert_alpha()
-        self.red_2 = pygame.image.load("assets/platforming/red_2.png").convert_alpha()
-        self.red_3 = pygame.image.load("assets/platforming/red_3.png").convert_alpha()
-        self.spring = pygame.image.load("assets/platforming/spring.png").convert_alpha()
-        self.spring_1 = pygame.image.load("assets/platforming/spring_1.png").convert_alpha()
-        self.spike = pygame.transform.scale(pygame.image.load("assets/platforming/spike.png").convert_alpha(), (50, 50))
+        self.green = atlas["green"]
+        self.blue = atlas["blue"]
+        self.red = atlas["red"]
+        self.red_1 = atlas["red_1"]
+        self.red_2 = atlas["red_2"]
+        self.red_3 = atlas["red_3"]
+        self.spring = atlas["spring"]
+        self.spring_1 = atlas["spring_1"]
+        self.spike = atlas["spike"]
+        self.platform_frames = {(0, 0): self.green, (1, 0): self.blue, (1, 1): self.blue, # (KIND, STATE): SPRITE
+                                (2, 0): self.red, (2, 1): self.red_1, (2, 2): self.red_2, (2, 3): self.red_3}
+        self.spring_frames = (self.spring, self.spring_1)
+
+        # STATIC LAYERS - BUILT ONCE, NOT EVERY FRAME
+        self.background = ASSETS.get(("layer", "grid", self.scale), self.build_background)
+        self.highscore_line = ASSETS.get(("layer", "highscore_line", self.scale),
+                                         lambda: self.build_strip((self.display.get_width(), max(1, round(3 * self.scale))), (255, 255, 0)))
 
         # CHARACTER SPRITES
-        left1 = load("assets/character sprites/train-a.png")
-        left2 = load("assets/character sprites/train-b.png")
-        right1 = pygame.transform.flip(left1, True, False)
-        right2 = pygame.transform.flip(left2, True, False)
-        self.sprite_sets = [(left1, right1), (left2, right2)]
-
-        # LOAD SFX
-        self.boing_sfx = pygame.mixer.Sound("assets/sfx/boing.wav")
-        self.break_sfx = pygame.mixer.Sound("assets/sfx/break.wav")
-        self.death_sfx = pygame.mixer.Sound("assets/sfx/death.wav")
-        self.jump_sfx = pygame.mixer.Sound("assets/sfx/jump.wav")
-        self.success_sfx = pygame.mixer.Sound("assets/sfx/success.wav")
-        self.newhighscore_sfx = pygame.mixer.Sound("assets/sfx/newhighscore.wav")
-
-        self.boing_sfx.set_volume(0.3)
-        self.break_sfx.set_volume(0.3)
-        self.death_sfx.set_volume(0.3)
-        self.jump_sfx.set_volume(0.3)
-        self.success_sfx.set_volume(0.3)
-        self.newhighscore_sfx.set_volume(0.3)
-
-        # LOAD MUSIC
-        self.theme_song = pygame.mixer.music.load('assets/music/theme.wav')
-
-    def setup_players(self):
-        self.player1 = Player(SCREEN_WIDTH//2-50, SCREEN_HEIGHT-400, *self.sprite_sets[0])
-        self.player2 = Player(SCREEN_WIDTH//2+50, SCREEN_HEIGHT-400, *self.sprite_sets[1])
+        self.sprite_sets = [(atlas["train-a"], atlas["train-a-right"]), (atlas["train-b"], atlas["train-b-right"])]
+        self.ghost_sets = [(atlas["ghost-a"], atlas["ghost-a-right"]), (atlas["ghost-b"], atlas["ghost-b-right"])]
+
+    def build_atlas(self): # FULL-SIZE SPRITES BY NAME, SCALED AND PACKED FOR THIS WINDOW
+        sprites = {name: ASSETS.image(f"assets/platforming/{name}.png") for name in
+                   ["green", "blue", "red", "red_1", "red_2", "red_3", "spring", "spring_1"]}
+        sprites["spike"] = ASSETS.image("assets/platforming/spike.png", size=(50, 50))
+        for letter in "ab":
+            for suffix, flip in (("", False), ("-right", True)):
+                train = ASSETS.image(f"assets/character sprites/train-{letter}.png", size=(100, 50), flip=flip)
+                sprites[f"train-{letter}{suffix}"] = train
+                sprites[f"ghost-{letter}{suffix}"] = self.build_ghost(train)
+        return SpriteAtlas(sprites, self.scale)
+
+    def build_background(self): # WHITE FILL AND GRID
+        background = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+        background.fill((255, 255, 255))
+        self.drawGrid(background)
+        if self.scale != 1:
+            background = pygame.transform.smoothscale(background, self.display.get_size()).convert()
+        return background
+
+    def build_ghost(self, img): # SEE-THROUGH COPY OF A PLAYER SPRITE, ALPHA BAKED INTO THE PIXELS SO IT PACKS INTO THE ATLAS
+        ghost = img.copy()
+        ghost.fill((255, 255, 255, 110), special_flags=pygame.BLEND_RGBA_MULT)
+        return ghost
+
+    def build_strip(self, size, color):
+        strip = pygame.Surface(size).convert()
+        strip.fill(color)
+        return strip
+
+    def setup_players(self): # HUMANS FOR THE MODE, THEN ANY BOTS
+        roster = (["human"] if self.mode == "singleplayer" else ["human", "human"]) + ["bot"] * self.session.bots
+        self.sim = Simulation(self.mode, self.autoscroll, roster=roster)
+        self.sim.profiler = self.profiler
+
+    def load_ghost(self): # RACE THE BEST REPLAY ON ITS LEVEL - RETURNS THE SEED TO START THIS RUN WITH
+        self.ghost = None
+        if not self.session.ghost:
+            return None
+        try:
+            replay = load_replay(f"replays/best-{self.mode}.thr")
+        except (OSError, ValueError):
+            return None
+        self.ghost = Ghost(replay)
+        return replay["seed"]
 
     def reset_game_state(self):
-        self.score = 0
-        self.highscores = load_highscores()
-        self.highscore = self.highscores.get(self.mode, 0)
-        self.cameray = 0
-        self.platforms = [[SCREEN_WIDTH//2-50, SCREEN_HEIGHT-300, 0, 0], [SCREEN_WIDTH//2-50, SCREEN_HEIGHT-300, 0, 0]] if self.mode != 'multiplayer' else [[SCREEN_WIDTH//2-50, SCREEN_HEIGHT-300, 0, 0], [SCREEN_WIDTH//2+50, SCREEN_HEIGHT-300, 0, 0]]
-        self.springs = []
-        self.spikes = []
+        self.highscore = HIGHSCORES.best(self.mode)
+        self.sim.highscore = self.highscore
+        self.sim.reset(self.load_ghost())
+        humans = self.sim.roster.count("human")
+        slots = range(humans) if self.demo else [slot for slot in self.session.autopilot if slot < humans]
+        self.autopilots = [Autopilot(self.sim, slot) for slot in slots]
+        if self.autopilots: # NOT A HUMAN'S SCORE
+            self.sim.assisted = True
+        self.rewind.clear()
+        self.quicksave = None
+        self.notice = None
+        self.pending = None
         self.game_over = False
         self.game_over_choice = None
 
+    @property
+    def score(self):
+        return self.sim.score
+
+    @property
+    def cameray(self):
+        return self.sim.cameray
+
     def run(self):
         pygame.mixer.music.play(-1) # PLAY BACKGROUND MUSIC
-        self.generatePlatforms()
-        clock = pygame.time.Clock()
+        self.clock.tick()
+        accumulator = 0
+        limit = 0 # THE FIRST FRAME OF A RUN IS DRAWN STRAIGHT AWAY, THE FRAME LIMITER STARTS AFTER IT
 
+        profiler = self.profiler
         while True:
+            profiler.begin_frame()
             result = self.handle_events()
+            profiler.lap("events")
 
             if result == "menu": # RETURN TO MENU
                 pygame.mixer.music.fadeout(0)
                 return "menu" 
             if not self.paused:
-                if self.autoscroll: self.cameray -= self.score // 10000 * 0.25 + 0.75  # AUTOSCROLLING
-                
-                # DRAWING THE SCREEN
-                self.screen.fill((255, 255, 255))
-                self.drawGrid()
-                self.drawPlatforms()
-                self.updatePlayers()
-                self.updatePlatforms()
-                self.screen.blit(self.font.render(f"Score: {self.score}", -1, (0, 0, 0)), (25, 25))
-
-                pygame.display.flip() # UPDATE DISPLAY
-                clock.tick(FPS)
-                
-                # UPDATE SCORE AND PLAYER POSITION - SPIKE AND SPRING AND MOVEMENT
-                # CHECK FOR GAME OVER
-                for player in [self.player1, self.player2]: # CHECK FOR GAME OVER AND SCORE UPDATING
-                    if -1 * player.y > self.score:
-                        self.score = -1 * int(player.y)
-                    if (player.y - self.cameray) > SCREEN_HEIGHT:
-                        if player == self.player1 or (self.mode == "multiplayer" and player == self.player2):
-                            if self.score > self.highscore:
-                                self.highscore = self.score
-                                self.highscores[self.mode] = self.score
-                                save_highscores(self.highscores)
-
-                            choice = self.game_over_screen()
-                            return choice
-
-                    for spike in self.spikes: # SPIKE KILL
-                        if player.jump <= 0 and pygame.Rect(spike[0] + (self.spike.get_width() / 4), spike[1], self.spike.get_width() * 0.25, self.spike.get_height() * 0.25).colliderect(player.get_rect()):
-                            if player == self.player1 or (self.mode == "multiplayer" and player == self.player2):
-                                if self.score > self.highscore:
-                                    self.highscore = self.score
-                                    self.highscores[self.mode] = self.score
-                                    save_highscores(self.highscores)
-
-                                self.game_over = True
-                                self.game_over_choice = self.game_over_screen()
-                                return self.game_over_choice
-                            
-                    for spring in self.springs: # SPRING BOOST BASED ON MODE
-                        if pygame.Rect(spring[0], spring[1], self.spring.get_width(), self.spring.get_height()).colliderect(player.get_rect()):
-                            spring[2] = 1
-                            if self.mode == "multiplayer":
-                                self.player1.gravity = 0
-                                self.player2.gravity = 0
-                                self.player1.jump = 40
-                                self.player2.jump = 40
-                                self.cameray -= 50
-                            else:
-                                player.gravity = 0
-                                if player.jump >= 20:
-                                    player.jump = 50
-                                else:
-                                    player.jump = 45
-                                self.cameray -= 90
-                                
-                            pygame.mixer.Sound.play(self.boing_sfx)
-                            
+                # FIXED TIMESTEP - RUN AS MANY TICKS AS REAL TIME PASSED, UP TO MAX_CATCHUP_TICKS
+                accumulator = min(accumulator + self.clock.tick(limit) / 1000, MAX_CATCHUP_TICKS * TICK_SECONDS)
+                profiler.lap("wait")
+                inputs = self.read_inputs()
+                for autopilot in self.autopilots:
+                    autopilot.think(AUTOPILOT_BUDGET / len(self.autopilots))
+                profiler.lap("autopilot")
+                ticks = 0
+                while accumulator >= TICK_SECONDS and not self.sim.game_over:
+                    self.tick(inputs)
+                    accumulator -= TICK_SECONDS
+                    ticks += 1
+                self.alpha = min(accumulator / TICK_SECONDS, 1)
+                self.render_frame()
+                profiler.end_frame(ticks, self.sim.entity_counts())
+                self.session.first_frame()
+                limit = self.render_fps
+
+                if self.sim.game_over and self.demo: # BACK TO THE MENU, WHICH STARTS ANOTHER DEMO IF IT STAYS UNTOUCHED
+                    pygame.mixer.music.fadeout(0)
+                    return "menu"
+                if self.sim.game_over: # CHECK FOR GAME OVER
+                    self.finish_run()
+                    self.game_over = True
+                    self.game_over_choice = self.game_over_screen()
+                    return self.game_over_choice
+
+    def tick(self, inputs): # ONE SIMULATION TICK AND WHAT HANGS OFF IT - ALSO DRIVEN BY benchmark.py, SO IT MEASURES THE REAL PATH
+        self.sim.step(*self.drive(inputs))
+        if self.ghost is not None:
+            self.ghost.advance(self.sim.ticks)
+            self.profiler.lap("ghost")
+        self.play_sounds()
+        self.profiler.lap("audio")
+        self.record_rewind()
+        self.profiler.lap("rewind")
+
+    def finish_run(self): # KEEP THE REPLAY, AND THE SCORE ONCE IT CHECKS OUT
+        if not self.sim.recordable: # BOTS AND GHOSTS CAN'T BE REPLAYED, AND BOT-ASSISTED SCORES DON'T COUNT
+            return
+        replay = replay_of(self.sim)
+        HIGHSCORES.keep_replay(replay, f"replays/last-{self.mode}.thr")
+        if HIGHSCORES.qualifies(self.mode, self.score):
+            self.pending = replay
+            HIGHSCORES.submit_replay(self.mode, replay, lambda rank: self.verified(replay, rank))
+
+    def verified(self, replay, rank): # HIGHSCORE WRITER THREAD - rank IS None IF THE REPLAY DIDN'T CHECK OUT
+        if self.pending is replay: # STILL ON ITS GAME OVER SCREEN - CLEARED FIRST, SO A FAILED SAVE CAN'T LEAVE IT PENDING
+            if rank == 1:
+                self.highscore = replay["score"]
+            self.pending = None
+        if rank == 1:
+            save_replay(replay, f"replays/best-{replay['mode']}.thr")
+
+    def render_frame(self): # DRAWING THE SCREEN - ONLY CHANGED AREAS ARE PUSHED UNLESS THE CAMERA MOVED
+        profiler = self.profiler
+        self.view_y = self.lerp(self.sim.prev_cameray, self.cameray)
+        sprites = []
+        self.drawPlatforms(sprites)
+        self.drawPlayers(sprites)
+        profiler.lap("queue")
+        sprites += TEXT.number(self.font, "Score: ", self.score, (0, 0, 0), (25, 25))
+        if self.notice and self.sim.ticks <= self.notice[1]:
+            sprites.append((TEXT.render(self.font, self.notice[0], (0, 0, 0)), (25, 60)))
+        profiler.lap("text")
+        self.drawProfiler(sprites)
+        profiler.lap("overlay")
+        self.renderer.present(sprites, self.view_y, profiler)
+        profiler.lap("present")
+
+    def record_rewind(self): # A SNAPSHOT EVERY SNAPSHOT_EVERY TICKS, THE BUFFER KEEPS THE LAST REWIND_SECONDS
+        if self.CAN_REWIND and self.sim.ticks % SNAPSHOT_EVERY == 0:
+            self.rewind.push(self.sim.ticks, self.sim.snapshot())
+
+    def rewind_run(self): # BACK REWIND_SECONDS, OR AS FAR AS THE BUFFER GOES
+        found = self.rewind.seek(self.sim.ticks - REWIND_SECONDS * FPS)
+        if found is None:
+            return
+        tick, snapshot = found
+        seconds = (self.sim.ticks - tick) / FPS
+        self.sim.restore(snapshot)
+        self.rewind.truncate(tick)
+        self.show_notice(f"Rewound {seconds:.1f} s")
+
+    def save_quick(self):
+        self.quicksave = (self.sim.snapshot(), bytes(self.sim.inputs))
+        self.show_notice("Quicksaved")
+
+    def load_quick(self):
+        if self.quicksave is None:
+            return
+        snapshot, inputs = self.quicksave
+        self.sim.inputs[:] = inputs
+        self.sim.restore(snapshot)
+        self.rewind.clear() # ITS HISTORY BELONGS TO ANOTHER TIMELINE NOW
+        self.show_notice("Quickloaded")
+
+    def show_notice(self, text): # A SECOND OF TEXT UNDER THE SCORE
+        self.notice = (text, self.sim.ticks + FPS)
+        self.renderer.invalidate()
 
     def handle_events(self):
         for event in pygame.event.get():
             if event.type == QUIT:
                 pygame.quit()
                 sys.exit()
+            if self.demo and event.type in (KEYDOWN, MOUSEBUTTONDOWN):
+                return "menu"
             if event.type == KEYDOWN:
-                if event.key == K_ESCAPE:
+                if event.key == K_F3: # PROFILER OVERLAY
+                    self.profiler.toggle()
+                    self.renderer.invalidate()
+                elif event.key == K_BACKSPACE and self.CAN_REWIND:
+                    self.rewind_run()
+                elif event.key == K_F5 and self.CAN_REWIND:
+                    self.save_quick()
+                elif event.key == K_F9 and self.CAN_REWIND:
+                    self.load_quick()
+                elif event.key == K_ESCAPE:
                     self.paused = not self.paused
                     if self.paused: # PAUSE SCREEN AND GAME AND MUSIC
                         pygame.mixer.music.pause()
                         result = self.draw_pause_screen()
+                        self.renderer.invalidate()
+                        self.clock.tick() # DON'T CATCH UP ON TIME SPENT PAUSED
+                        self.profiler.begin_frame()
                         if result == "menu":
                             return "menu"              
 
-    def updatePlayers(self): # PLAYER MOVEMENT
+    def drive(self, inputs): # AUTOPILOT SLOTS OVERRIDE THE KEYBOARD, ASKED AGAIN EVERY TICK
+        if not self.autopilots:
+            return inputs
+        inputs = list(inputs)
+        for autopilot in self.autopilots:
+            inputs[autopilot.slot] = autopilot.next_input()
+        return inputs
+
+    def read_inputs(self): # KEYBOARD TO INPUT BITFIELDS FOR THE SIMULATION
         keys = pygame.key.get_pressed()
+        bits = lambda left_keys, right_keys: (INPUT_LEFT if any(keys[k] for k in left_keys) else 0) | (INPUT_RIGHT if any(keys[k] for k in right_keys) else 0)
         if self.mode == "singleplayer":
-            self.player1.update(keys, [K_a, K_LEFT], [K_d, K_RIGHT])
-        else:
-            self.player1.update(keys, [K_a], [K_d])
-            self.player2.update(keys, [K_LEFT], [K_RIGHT])
-
-        for player in [self.player1, self.player2]: # CAMERA MOVEMENT
-            if player.y - self.cameray <= -100:
-                self.cameray -= 45
-            if player.y - self.cameray <= 100:
-                self.cameray -= 35
-            elif player.y - self.cameray <= 300:
-                self.cameray -= 15
-
-        self.player1.draw(self.screen, self.cameray)
-        if self.mode == "multiplayer":
-            self.player2.draw(self.screen, self.cameray)
-
-    def updatePlatforms(self): # PLAYER AND PLATFORM COLLISION, PLATFORM MOVEMENT
-        for p in self.platforms:
-            rect = pygame.Rect(p[0], p[1], self.green.get_width() - 10, self.green.get_height())
-            for player in [self.player1, self.player2]:
-                if rect.colliderect(player.get_rect()) and player.gravity and player.y < (p[1] - self.cameray): # PLAYER COLLISION WITH PLATFORM
-                    if p[2] != 2: # JUMP IF NOT RED
-                        player.jump = 15
-                        player.gravity = 0
-                        pygame.mixer.Sound.play(self.jump_sfx)
-                    else: # RED PLATFORM
-                        if p[3] == 0 or p[3] == 1: # IF STAGE 0 OR 1, JUMP AND RANDOMLY INCREASE STATE/DISAPPEAR
-                            player.jump = 15
-                            player.gravity = 0
-                            pygame.mixer.Sound.play(self.jump_sfx)
-                            if random.random() > 0.1:
-                                p[3] += 1
-                                pygame.mixer.Sound.play(self.break_sfx)
-                            if p[3] == 1 and random.random() < 0.3:
-                                p[3] = 3
-                                pygame.mixer.Sound.play(self.break_sfx)
-
-                        elif p[3] == 2: # IF STAGE 2, CHANCE FOR JUMP, DISAPPEAR, BIG BOOST
-                            if random.random() < 0.3:
-                                player.jump = 15
-                                player.gravity = 0
-                                pygame.mixer.Sound.play(self.jump_sfx)
-                                p[3] += 1
-                            elif random.random() < 0.1:
-                                p[3] = 0
-                            else:
-                                pygame.mixer.Sound.play(self.success_sfx)
-                                if self.mode == "singleplayer":
-                                    player.gravity = 0
-                                    player.jump = 50
-                                    self.cameray -= 60
-                                else:
-                                    self.player1.gravity = 0
-                                    self.player2.gravity = 0
-                                    self.player1.jump = 40
-                                    self.player2.jump = 40
-                                    self.cameray -= 50
-                                p[3] += 1
-
-            if p[2] == 1: # BLUE PLATFORM MOVEMENT, BASED ON SPEED
-                speed = p[4]
-                if p[3] == 1:
-                    p[0] += speed
-                    if p[0] > SCREEN_WIDTH - 100:
-                        p[3] = 0
-                else:
-                    p[0] -= speed
-                    if p[0] <= 0:
-                        p[3] = 1
-
-    def drawPlatforms(self): # DRAWING THE PLATFORMS, SPIKES, SPRINGS, HIGH SCORE LINE, AND CREATION OF NEW PLATFORMS
+            return bits([K_a, K_LEFT], [K_d, K_RIGHT]), 0
+        return bits([K_a], [K_d]), bits([K_LEFT], [K_RIGHT])
+
+    def play_sounds(self): # SOUND CUES RAISED BY THE LAST SIMULATION STEP
+        self.audio.begin_tick()
+        for event in self.sim.events:
+            if event != "death": # THE GAME OVER SCREEN PLAYS THAT ONE
+                self.audio.play(event)
+
+    def drawProfiler(self, sprites): # LIVE p50/p99 PER PHASE, TOP RIGHT
+        lines = self.profiler.lines
+        if lines and self.session.retry_ms is not None:
+            lines = lines + [f"retry to first frame {self.session.retry_ms:.1f} ms"]
+        for i, line in enumerate(lines):
+            sprites.append((TEXT.render(self.profiler_font, line, (200, 0, 0)), (SCREEN_WIDTH - 340, 10 + i * 18)))
+
+    def lerp(self, previous, current): # POSITION AT self.alpha BETWEEN THE LAST TWO TICKS
+        if abs(current - previous) > SCREEN_WIDTH // 2: # WRAPPED AROUND THE SCREEN EDGE
+            return current
+        return previous + (current - previous) * self.alpha
+
+    def drawPlayers(self, sprites):
+        for i, player in enumerate(self.sim.players):
+            if not player.playing: # A BOT THAT DROPPED OUT
+                continue
+            left_img, right_img = self.sprite_sets[i % 2]
+            img = right_img if player.direction == 0 else left_img
+            y = self.lerp(player.prev_y, player.y) - self.view_y
+            if -PLAYER_HEIGHT < y < SCREEN_HEIGHT:
+                sprites.append((img, (self.lerp(player.prev_x, player.x), y)))
+        if self.ghost is None:
+            return
+        ticks = self.sim.ticks
+        for i, ((prev_x, prev_y, _), (x, y, direction)) in enumerate(zip(self.ghost.at(max(ticks - 1, 0)), self.ghost.at(ticks))):
+            left_img, right_img = self.ghost_sets[i % 2]
+            y = self.lerp(prev_y, y) - self.view_y
+            if -PLAYER_HEIGHT < y < SCREEN_HEIGHT:
+                sprites.append((right_img if direction == 0 else left_img, (self.lerp(prev_x, x), y)))
+
+    def drawPlatforms(self, sprites): # QUEUE THE PLATFORMS, SPIKES, SPRINGS AND HIGH SCORE LINE
+        view_y = self.view_y
         # HIGH SCORE LINE
-        highscore_y = (self.highscore)
-        pygame.draw.line(self.screen, (255, 255, 0), (0, -1 * (highscore_y + self.cameray)), (SCREEN_WIDTH, -1 * (highscore_y + self.cameray)), 3)
-        for player in [self.player1]:
-            if -1.1 * highscore_y <= player.y <= -0.9 * highscore_y:
-                self.screen.blit(self.font.render("Highscore!", -1, (255, 255, 0)), (SCREEN_WIDTH // 2 - 100, SCREEN_HEIGHT // 2 - 50))
-                pygame.mixer.Sound.play(self.newhighscore_sfx)
-                if self.mode == "singleplayer":
-                    player.gravity = 0
-                    player.jump = 50
-                else:
-                    self.player1.gravity = 0
-                    self.player2.gravity = 0
-                    self.player1.jump = 50
-                    self.player2.jump = 50
-                self.cameray -= 20
-            
-        # DRAWING THE PLATFORMS, SPIKES, SPRINGS
-        for p in self.platforms:   
-            # PLATFORM CREATION         
-            if self.platforms[1][1] - self.cameray > (SCREEN_HEIGHT):
-                platform = random.choices([0, 1, 2], weights=[65, 50, 35])[0]
-
-                if self.score < 30000: # SPIKE AND DIST, GRADUALLY INCREASE DIFFICULTY
-                    spawnSpike = random.randint(1, 10) == 1
-                    dist = self.score // 250 + 50
-                elif self.score < 100000: # DIFFERENT RULE AT 30000 to 100000
-                    spawnSpike = random.randint(1, 5) == 1
-                    dist = self.score // 750 + 30
-                else: # DIFFERENT RULE PAST 100000
-                    spawnSpike = random.randint(1, 3) == 1
-                    dist = self.score // 1000 + 30
-
-                speed = random.uniform(3, 7) if platform == 1 else 0 # RULE FOR SPEED OF BLUE PLATFORM
-                self.platforms.append([random.randint(0, SCREEN_WIDTH-100), self.platforms[-1][1] - dist, platform, 0, speed]) # ADD TO LIST
-                coords = self.platforms[-1]
-
-                if random.randint(0, 1000) > 900 and platform == 0: # ADD SPRING CHANCE
-                    self.springs.append([coords[0] + random.randint(0, 50), coords[1] - 25, 0]) 
-                if spawnSpike and (self.platforms[-1][2] != 1): # ADD SPIKE
-                    self.spikes.append([coords[0] + random.randint(0, 50), coords[1] - 50, 0])
-                
-                self.platforms.pop(0)
-
-            # DRAWING THE PLATFORMS
-            if p[2] == 0:
-                self.screen.blit(self.green, (p[0], p[1] - self.cameray))
-            elif p[2] == 1:
-                self.screen.blit(self.blue, (p[0], p[1] - self.cameray))
-            elif p[2] == 2:
-                if p[3] == 0:
-                    self.screen.blit(self.red, (p[0], p[1] - self.cameray))
-                elif p[3] == 1:
-                    self.screen.blit(self.red_1, (p[0], p[1] - self.cameray))
-                elif p[3] == 2:
-                    self.screen.blit(self.red_2, (p[0], p[1] - self.cameray))
-                else:
-                    self.screen.blit(self.red_3, (p[0], p[1] - self.cameray))
-
-        for spike in self.spikes: # DRAW SPIKE
-            self.screen.blit(self.spike, (spike[0], spike[1] - self.cameray))
-
-        for spring in self.springs: # DRAW SPRING
-            self.screen.blit(self.spring_1 if spring[2] else self.spring, (spring[0], spring[1] - self.cameray))
-
-    def generatePlatforms(self): # PLATFORM GENERATION AT START - SIMPLE AND EASY GUIDE
-        on = SCREEN_HEIGHT+100
-        while on > -500:
-            x = random.randint(0, SCREEN_WIDTH-100)
-            platform = random.choices([0, 1, 2], weights=[75, 50, 25])[0]
-            speed = random.uniform(4, 7.5) if platform == 1 else 0
-            self.platforms.append([x, on, platform, 0, speed])
-            on -= 50
-
-    def drawGrid(self): # BACKGROUND GRID
+        highscore_y = -1 * (self.highscore + view_y) - 1
+        if -3 < highscore_y < SCREEN_HEIGHT:
+            sprites.append((self.highscore_line, (0, highscore_y)))
+        if "newhighscore" in self.sim.events:
+            sprites.append((TEXT.render(self.font, "Highscore!", (255, 255, 0)), (SCREEN_WIDTH // 2 - 100, SCREEN_HEIGHT // 2 - 50)))
+
+        # ONLY WHAT THE CAMERA CAN SEE - PREFETCHED AND NOT YET CULLED ENTITIES ARE SKIPPED HERE
+        frames = self.platform_frames
+        for p in self.sim.platforms:
+            y = p.y - view_y
+            if -PLATFORM_HEIGHT < y < SCREEN_HEIGHT:
+                sprites.append((frames[p.kind, p.state], (self.lerp(p.prev_x, p.x) if p.kind == 1 else p.x, y)))
+
+        for spike in self.sim.spikes: # DRAW SPIKE
+            y = spike.y - view_y
+            if -SPIKE_SIZE < y < SCREEN_HEIGHT:
+                sprites.append((self.spike, (spike.x, y)))
+
+        frames = self.spring_frames
+        for spring in self.sim.springs: # DRAW SPRING
+            y = spring.y - view_y
+            if -SPRING_SIZE < y < SCREEN_HEIGHT:
+                sprites.append((frames[spring.state], (spring.x, y)))
+
+    def drawGrid(self, surface): # BACKGROUND GRID
         for x in range(120):
-            pygame.draw.line(self.screen, (222, 222, 222), (x * 12, 0), (x * 12, SCREEN_HEIGHT))
-            pygame.draw.line(self.screen, (222, 222, 222), (0, x * 12), (SCREEN_WIDTH, x * 12))
+            pygame.draw.line(surface, (222, 222, 222), (x * 12, 0), (x * 12, SCREEN_HEIGHT))
+            pygame.draw.line(surface, (222, 222, 222), (0, x * 12), (SCREEN_WIDTH, x * 12))
 
     def game_over_screen(self): # GAME OVER
         pygame.mixer.music.fadeout(0)
-        death_sfx_temp = pygame.mixer.Sound.play(self.death_sfx) # DEATH SFX
-        clock = pygame.time.Clock()
-        font_large = pygame.font.SysFont("Arial", 50)
-        font_small = pygame.font.SysFont("Arial", 30)
+        self.audio.begin_tick()
+        death_sfx_temp = self.audio.play("death") # DEATH SFX
+        font_large = ASSETS.font("Arial", 50)
+        font_small = ASSETS.font("Arial", 30)
         center_x = SCREEN_WIDTH // 2 
         title_y = SCREEN_HEIGHT // 4 + 100
         button_width = 200
@@ -619,66 +2241,177 @@ class TrainHop:
         retry_button = pygame.Rect(center_x - button_width // 2, title_y + 150, button_width, button_height)
         menu_button = pygame.Rect(center_x - button_width // 2, retry_button.bottom + spacing, button_width, button_height)
 
-        while True:
-            bg = pygame.image.load("assets/backgrounds/background.png")
+        def draw():
+            bg = ASSETS.image("assets/backgrounds/background.png", alpha=False)
             self.screen.blit(bg, (0, 0))
 
             # Draw text
-            game_over_text = font_large.render("Game Over", True, (0, 0, 0))
+            game_over_text = TEXT.render(font_large, "Game Over", (0, 0, 0))
             self.screen.blit(game_over_text, (center_x - game_over_text.get_width() // 2, title_y))
 
-            score_text = font_small.render(f"Score: {self.score}", True, (0, 0, 0))
+            score_text = TEXT.render(font_small, f"Score: {self.score}" + (" (pending)" if self.pending else ""), (0, 0, 0))
             self.screen.blit(score_text, (center_x - score_text.get_width() // 2, title_y + 60))
 
-            highscore_text = font_small.render(f"High Score: {self.highscore}", True, (0, 0, 0))
+            highscore_text = TEXT.render(font_small, f"High Score: {self.highscore}", (0, 0, 0))
             self.screen.blit(highscore_text, (center_x - highscore_text.get_width() // 2, title_y + 90))
 
             # Draw buttons
             pygame.draw.rect(self.screen, (100, 200, 100), retry_button)
             pygame.draw.rect(self.screen, (200, 100, 100), menu_button)
 
-            retry_text = font_small.render("Retry", True, (0, 0, 0))
+            retry_text = TEXT.render(font_small, "Retry", (0, 0, 0))
             self.screen.blit(retry_text, (center_x - retry_text.get_width() // 2, retry_button.y + 10))
 
-            menu_text = font_small.render("Menu", True, (0, 0, 0))
+            menu_text = TEXT.render(font_small, "Menu", (0, 0, 0))
             self.screen.blit(menu_text, (center_x - menu_text.get_width() // 2, menu_button.y + 10))
 
-            pygame.display.flip() # Update the display
-            clock.tick(FPS)
-
-            for event in pygame.event.get(): # BUTTON HANDLING
-                if event.type == pygame.QUIT:
-                    sys.exit()
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    if retry_button.collidepoint(event.pos):
-                        death_sfx_temp.fadeout(0)
-                        return "retry"
-                    elif menu_button.collidepoint(event.pos):
-                        death_sfx_temp.fadeout(0)
-                        return "menu"
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_r:
-                        death_sfx_temp.fadeout(0)
-                        return "retry"
-                    elif event.key == pygame.K_m:
-                        death_sfx_temp.fadeout(0)
-                        return "menu"
+        def handle(event): # BUTTON HANDLING
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                if retry_button.collidepoint(ui_pos(event.pos)):
+                    return "retry"
+                elif menu_button.collidepoint(ui_pos(event.pos)):
+                    return "menu"
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_r:
+                    return "retry"
+                elif event.key == pygame.K_m:
+                    return "menu"
+            return None
+
+        result = run_screen(self.screen, lambda: self.pending is None, draw, handle) # REDRAWN WHEN THE SCORE IS VERIFIED
+        death_sfx_temp.fadeout(0)
+        return result
+
+
+class GameSession: # ONE PER PROCESS - OWNS PYGAME, THE DISPLAY, THE MIXER, FONTS AND LOADED ASSETS
+    def __init__(self, render_fps=FPS, profiler=None, bots=0, ghost=False, scale=1, autopilot=(), asset_cache=True):
+        self.bots = bots # EXTRA COMPUTER PLAYERS IN EVERY RUN
+        self.autopilot = autopilot # HUMAN SLOTS (0 = PLAYER 1) THE AUTOPILOT PLAYS IN EVERY RUN
+        self.ghost = ghost # RACE THE BEST REPLAY
+        self.scale = scale # INTERNAL RESOLUTION AS A FRACTION OF SCREEN_WIDTH x SCREEN_HEIGHT
+        pygame.init()
+        pygame.display.set_caption("Train Hop")
+        if scale == 1:
+            self.display = self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        else: # SDL STRETCHES THE SMALL WINDOW SURFACE ON THE GPU, MENUS ARE DRAWN TO A FULL-SIZE CANVAS AND SHRUNK
+            self.display = pygame.display.set_mode((round(SCREEN_WIDTH * scale), round(SCREEN_HEIGHT * scale)), pygame.SCALED)
+            self.screen = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+        self.render_fps = render_fps
+        self.profiler = profiler or FrameProfiler()
+        if asset_cache: # BAKED BY --bake, ANYTHING MISSING OR OUT OF DATE IS DECODED FROM SOURCE INSTEAD
+            ASSETS.load_cache(asset_cache_path(scale))
+        ASSETS.preload(*BACKGROUND_ASSETS, alpha=False) # STREAMED IN ON THE LOADER THREAD WHILE THE MENU COMES UP
+        ASSETS.preload(*GAME_ASSETS)
+        ASSETS.preload_baked()
+        self.audio = AudioManager() # SMALL CLIPS STAY DECODED, LONG ONES LOAD WHEN PLAYED
+        self.audio.preload()
+        ASSETS.music('assets/music/theme.wav')
+        self.menu = Menu(self.screen)
+        self.game = None
+        self.demos = 0
+        self.retry_started = None
+        self.retry_ms = None # LAST RETRY-TO-FIRST-FRAME TIME
+
+    def play(self, mode, demo=False):
+        if self.game is None:
+            self.game = TrainHop(mode, self.menu.autoscroll_enabled, session=self, demo=demo)
+        else:
+            self.game.start(mode, self.menu.autoscroll_enabled, demo)
+        return self.game.run()
+
+    def first_frame(self): # CALLED AFTER EVERY GAME FRAME, ONLY THE FIRST ONE AFTER A RETRY COUNTS
+        if self.retry_started is not None:
+            self.retry_ms = (time.perf_counter() - self.retry_started) * 1000
+            self.retry_started = None
+
+    def run(self):
+        try:
+            self.loop()
+        finally: # QUITTING GOES THROUGH sys.exit, WHICH STILL RUNS THIS
+            self.profiler.close()
+
+    def loop(self):
+        while True:
+            mode = self.menu.run()
+            if mode == "demo": # NOBODY IS PLAYING - SHOW THE GAME PLAYING ITSELF, TAKING TURNS AT EACH MODE
+                self.play(("singleplayer", "multiplayer")[self.demos % 2], demo=True)
+                self.demos += 1
+                continue
+            while mode: # MODE RETURNED BY MENU
+                result = self.play(mode)
+                if result == "retry":
+                    self.retry_started = time.perf_counter()
+                    continue  # restart same mode
+                elif result == "menu":
+                    break     # return to menu, breaking back to menu
+
+
+def measure_startup(scale, asset_cache): # MS FROM PYGAME STARTING UNTIL THE MENU IS DRAWN AND UNTIL A GAME HAS EVERY ASSET
+    start = time.perf_counter()
+    session = GameSession(0, scale=scale, asset_cache=asset_cache)
+    session.menu.draw()
+    menu = time.perf_counter()
+    TrainHop("singleplayer", session=session)
+    ASSETS.finish()
+    stats = ASSETS.stats()
+    return {"menu_ms": round((menu - start) * 1000, 1), "game_ms": round((time.perf_counter() - start) * 1000, 1),
+            "baked": stats["baked"], "stale": stats["stale"], "load_ms": stats["load_ms"]}
+
+
+def startup_times(scale, asset_cache): # IN A FRESH PROCESS, SO NOTHING IS ALREADY LOADED
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), "--startup", "--scale", str(scale)] +
+                         ([] if asset_cache else ["--no-asset-cache"]), capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def bake_assets(scale): # DECODE EVERYTHING A GAME AT THIS SCALE LOADS, WRITE IT OUT READY TO USE, THEN TIME A START WITHOUT AND WITH IT
+    cold = startup_times(scale, False)
+    session = GameSession(0, scale=scale, asset_cache=False)
+    TrainHop("singleplayer", session=session)
+    for path, priority, interval in AudioManager.EFFECTS.values(): # LONG CLIPS TOO, THEY ARE READ FROM THE FILE WHEN PLAYED
+        ASSETS.sound(path)
+    path = asset_cache_path(scale)
+    count, size = ASSETS.bake(path, session.audio.streamed)
+    warm = startup_times(scale, True)
+    print(f"baked {count} assets into {path} ({size / (1024 * 1024):.1f} MB)")
+    for name, times in (("cold (from source)", cold), ("warm (baked)", warm)):
+        print(f"{name:<19} menu {times['menu_ms']:>7.1f} ms  game {times['game_ms']:>7.1f} ms  loader thread {times['load_ms']:>7.1f} ms  "
+              f"stale {times['stale']}")
 
 
 def main():
-    pygame.init()
-    pygame.display.set_caption("Train Hop")
-    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-    menu = Menu(screen)
-    while True:
-        mode = menu.run()
-        while mode: # MODE RETURNED BY MENU
-            game = TrainHop(mode, menu.autoscroll_enabled)
-            result = game.run()
-            if result == "retry":
-                continue  # restart same mode
-            elif result == "menu":
-                break     # return to menu, breaking back to menu
+    parser = argparse.ArgumentParser(description="Train Hop")
+    parser.add_argument("--fps", type=int, default=FPS, help="cap on rendered frames per second, 0 for no cap (game speed is unaffected)")
+    parser.add_argument("--replay", metavar="FILE", help="re-simulate a recorded run without a window and check its score")
+    parser.add_argument("--profile", metavar="FILE", help="stream per-frame phase timings to FILE (.csv, otherwise JSON lines)")
+    parser.add_argument("--bots", type=int, default=0, help="computer players to add to every run (scores with bots aren't saved)")
+    parser.add_argument("--ghost", action="store_true", help="race a ghost of your best run on the same level")
+    parser.add_argument("--scale", type=float, default=1, help="render at this fraction of 1280x1024 and let the window scale it up, e.g. 0.5")
+    parser.add_argument("--autopilot", choices=["p1", "p2", "both"], help="let the computer play as player 1, player 2 or both (scores aren't saved)")
+    parser.add_argument("--bake", action="store_true", help=f"pre-process every asset for this --scale into {ASSET_CACHE_DIR}/ and time a start without and with it")
+    parser.add_argument("--no-asset-cache", action="store_true", help="decode every asset from its source file, ignoring anything baked")
+    parser.add_argument("--startup", action="store_true", help=argparse.SUPPRESS) # CHILD OF --bake - PRINT measure_startup AS JSON
+    args = parser.parse_args()
+    profiler = FrameProfiler(args.profile)
+
+    if args.bake:
+        bake_assets(args.scale)
+        return
+    if args.startup:
+        print(json.dumps(measure_startup(args.scale, not args.no_asset_cache)))
+        return
+
+    if args.replay:
+        replay = load_replay(args.replay)
+        start = time.perf_counter()
+        ok, sim = verify_replay(replay)
+        elapsed = time.perf_counter() - start
+        print(f"{replay['mode']} seed {replay['seed']}: {sim.ticks} ticks in {elapsed:.3f}s ({sim.ticks / FPS / max(elapsed, 1e-9):.0f}x real time)")
+        print(f"recorded score {replay['score']}, replayed score {sim.score} - {'OK' if ok else 'MISMATCH'}")
+        sys.exit(0 if ok else 1)
+
+    autopilot = {None: (), "p1": (0,), "p2": (1,), "both": (0, 1)}[args.autopilot]
+    GameSession(args.fps, profiler, args.bots, args.ghost, args.scale, autopilot, not args.no_asset_cache).run()
 
 
 if __name__ == "__main__":